@@ -0,0 +1,8 @@
+import os
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eventflow.settings')
+    import django
+
+    django.setup()
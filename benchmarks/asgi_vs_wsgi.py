@@ -0,0 +1,151 @@
+"""Sync views under WSGI vs async views under ASGI at high concurrency.
+
+    python -m benchmarks.asgi_vs_wsgi [--concurrency 200] [--requests 4000] [--threads 32] [--no-page-cache]
+
+Both handlers run in-process against a throwaway SQLite file. WSGI requests
+are served by a thread pool the size of a typical threaded server; ASGI
+requests all run on one event loop, as under uvicorn or daphne.
+
+Django still runs each ASGI request's ORM calls in a per-request thread, so
+on SQLite every request opens a fresh connection; compare the two modes on
+the database you deploy to before switching servers.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time as time_of_day, timedelta
+from io import BytesIO
+
+from benchmarks import setup_django
+
+
+def wsgi_environ(path, query):
+    return {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(), 'wsgi.errors': BytesIO(),
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+
+
+def asgi_scope(path, query):
+    return {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'headers': [(b'host', b'localhost')], 'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+    }
+
+
+def summarize(label, latencies, elapsed, failures):
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{label}: {len(latencies)} requests in {elapsed:.2f}s = {len(latencies) / elapsed:.0f} req/s, "
+          f"median {statistics.median(latencies) * 1000:.1f} ms, p95 {p95:.1f} ms, {failures} non-200")
+
+
+def run_wsgi(targets, total, threads):
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+
+    handler = WSGIHandler()
+    statuses = []
+
+    def one(index):
+        path, query = targets[index % len(targets)]
+        started = time.perf_counter()
+        body = handler(wsgi_environ(path, query), lambda status, headers: statuses.append(status))
+        b''.join(body)
+        body.close()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads, initializer=connections.close_all) as pool:
+        latencies = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+    summarize(f"sync/WSGI  ({threads} threads)", latencies, elapsed,
+              sum(1 for status in statuses if not status.startswith('200')))
+
+
+async def run_asgi(targets, total, concurrency):
+    from django.core.handlers.asgi import ASGIHandler
+
+    handler = ASGIHandler()
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def one(index):
+        nonlocal failures
+        path, query = targets[index % len(targets)]
+
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # The client never disconnects; Django cancels this when done.
+            await asyncio.Future()
+
+        async def send(message):
+            nonlocal failures
+            if message['type'] == 'http.response.start' and message['status'] != 200:
+                failures += 1
+
+        async with semaphore:
+            started = time.perf_counter()
+            await handler(asgi_scope(path, query), receive, send)
+            return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(one(index) for index in range(total)))
+    elapsed = time.perf_counter() - started
+    summarize(f"async/ASGI ({concurrency} in flight)", list(latencies), elapsed, failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--threads', type=int, default=32, help="WSGI worker threads.")
+    parser.add_argument('--events', type=int, default=500)
+    parser.add_argument('--no-page-cache', action='store_true', help="Render every request from the database.")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DB_NAME'] = os.path.join(workdir, 'bench.sqlite3')
+    setup_django()
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from events.models import Event
+
+    # DEBUG would record every query in memory and skew both runs
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['localhost']
+    if args.no_page_cache:
+        settings.CACHES['default'] = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    call_command('migrate', verbosity=0)
+
+    organizer = User.objects.create(username='organizer')
+    start = date(2025, 1, 1)
+    events = [
+        Event.objects.create(
+            title=f'Event {index}', description='Lorem ipsum dolor sit amet. ' * 4,
+            date=start + timedelta(days=index % 365), time=time_of_day(18, 0),
+            location='Pune', address='Hall', organizer=organizer,
+        )
+        for index in range(args.events)
+    ]
+    targets = [('/', ''), ('/', 'q=Event+1'), ('/', 'date=past')]
+    targets += [(f'/event/{event.pk}/', '') for event in events[:50]]
+
+    run_wsgi(targets, args.requests, args.threads)
+    asyncio.run(run_asgi(targets, args.requests, args.concurrency))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Per-card render cost of home.html with and without event card fragment caching.
+
+    python -m benchmarks.card_render [--events 1000] [--repeat 5]
+"""
+import argparse
+import statistics
+import time
+from datetime import date, time as time_of_day, timedelta
+
+from benchmarks import setup_django
+
+
+def build_events(count, organizer):
+    from events.models import Event
+
+    events = []
+    start = date(2025, 1, 1)
+    for pk in range(1, count + 1):
+        event = Event(
+            pk=pk,
+            title=f'Event {pk}',
+            description='Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 6,
+            date=start + timedelta(days=pk % 365),
+            time=time_of_day(18, 0),
+            location='Pune',
+            address=f'{pk} Main Street',
+            organizer=organizer,
+        )
+        event.cache_version = 1
+        events.append(event)
+    return events
+
+
+def time_renders(request, events, repeat):
+    from django.template.loader import render_to_string
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render_to_string('home.html', {'events': events}, request)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import AnonymousUser, User
+    from django.core.cache import caches
+    from django.test import RequestFactory, override_settings
+
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    events = build_events(args.events, User(pk=1, username='organizer'))
+
+    dummy = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    with override_settings(CACHES=dummy):
+        uncached = time_renders(request, events, args.repeat)
+
+    locmem = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'card-bench',
+        'OPTIONS': {'MAX_ENTRIES': args.events * 2},
+    }}
+    with override_settings(CACHES=locmem):
+        caches['default'].clear()
+        time_renders(request, events, 1)  # warm the fragments
+        cached = time_renders(request, events, args.repeat)
+
+    for label, seconds in (('uncached', uncached), ('fragment cached', cached)):
+        print(f"{label:>16}: {seconds * 1000:8.1f} ms/page  {seconds / args.events * 1e6:8.1f} us/card")
+    print(f"{'speedup':>16}: {uncached / cached:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Registrations per second under N parallel writers on a throwaway SQLite file.
+
+    python -m benchmarks.concurrent_registrations [--writers 8] [--per-writer 200] [--no-tuning]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--per-writer', type=int, default=200)
+    parser.add_argument('--no-tuning', action='store_true', help="Run with SQLite defaults.")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DB_NAME'] = os.path.join(workdir, 'bench.sqlite3')
+    os.environ['DB_TUNING'] = 'False' if args.no_tuning else 'True'
+    setup_django()
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import OperationalError, connection
+    from events.models import Event, Registration
+
+    if args.no_tuning:
+        settings.DATABASES['default']['OPTIONS'] = {}
+    call_command('migrate', verbosity=0)
+
+    organizer = User.objects.create(username='organizer')
+    events = [
+        Event.objects.create(
+            title=f'Event {index}', description='', date='2025-01-01', time='18:00',
+            location='Pune', address='Hall', organizer=organizer,
+        )
+        for index in range(args.per_writer)
+    ]
+    users = User.objects.bulk_create(
+        [User(username=f'writer{index}') for index in range(args.writers)]
+    )
+    connection.close()
+
+    errors = []
+    barrier = threading.Barrier(args.writers)
+
+    def writer(user):
+        barrier.wait()
+        try:
+            for event in events:
+                try:
+                    Registration.objects.get_or_create(event=event, user=user)
+                except OperationalError as exc:
+                    errors.append(str(exc))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=writer, args=(user,)) for user in users]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    done = Registration.objects.count()
+    mode = 'defaults' if args.no_tuning else 'tuned'
+    print(f"{mode}: {args.writers} writers, {done} registrations in {elapsed:.2f}s "
+          f"= {done / elapsed:.0f} registrations/s, {len(errors)} lock errors")
+    if errors:
+        print(f"  first error: {errors[0]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Seeded synthetic dataset for the benchmark runner.
+
+    python -m benchmarks.datagen --db bench.sqlite3 [--events 100000] [--users 50000]
+                                 [--registrations 1000000] [--seed 42]
+
+The same seed and sizes always produce the same rows, so results from
+benchmarks.run are comparable between machines and commits. Rows are
+written with bulk_create; the search index, profiles and seat counters that
+per-row signals would maintain are rebuilt once at the end.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, time as time_of_day, timedelta
+
+from benchmarks import setup_django
+
+BATCH_SIZE = 5000
+PASSWORD = 'bench'
+# Fixed, not today(), so the same seed gives the same rows on any day
+BASE_DATE = date(2026, 1, 1)
+CITIES = ['Pune', 'Mumbai', 'Bengaluru', 'Delhi', 'Hyderabad', 'Chennai', 'Kolkata', 'Jaipur']
+TOPICS = ['Python', 'Django', 'Data', 'Design', 'Startup', 'Music', 'Yoga', 'Cloud', 'Security', 'AI']
+KINDS = ['Meetup', 'Workshop', 'Conference', 'Hackathon', 'Talk', 'Festival']
+WORDS = (
+    'community learn build share hands-on session speakers networking beginners advanced '
+    'open source lightning talks panel demo food venue parking schedule agenda'
+).split()
+
+
+def batched(items, size=BATCH_SIZE):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate(events, users, registrations, seed, stdout=print):
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.db import transaction
+
+    from events import search
+    from events.importer import seat_counts
+    from events.models import Event, Registration, UserProfile
+
+    rng = random.Random(seed)
+    password = make_password(PASSWORD, salt='benchmark')
+    started = time.monotonic()
+
+    with transaction.atomic():
+        for batch in batched(
+            User(username=f'user{index}', email=f'user{index}@example.com', password=password)
+            for index in range(users)
+        ):
+            User.objects.bulk_create(batch)
+        user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+        for batch in batched(
+            UserProfile(user_id=pk, full_name=f'User {pk}', location=rng.choice(CITIES)) for pk in user_ids
+        ):
+            UserProfile.objects.bulk_create(batch)
+    stdout(f"users: {len(user_ids)} in {time.monotonic() - started:.1f}s")
+
+    # Organizers are the first 2% of users; dates spread two years either side of BASE_DATE.
+    organizers = user_ids[:max(1, len(user_ids) // 50)]
+    with transaction.atomic():
+        for batch in batched(
+            Event(
+                title=f'{rng.choice(TOPICS)} {rng.choice(KINDS)} {index}',
+                description=' '.join(rng.choices(WORDS, k=40)),
+                date=BASE_DATE + timedelta(days=rng.randint(-730, 730)),
+                time=time_of_day(rng.randint(8, 21), rng.choice((0, 30))),
+                location=rng.choice(CITIES),
+                address=f'{rng.randint(1, 999)} Main Road',
+                organizer_id=rng.choice(organizers),
+                capacity=rng.choice((None, None, 50, 200, 1000)),
+            )
+            for index in range(events)
+        ):
+            Event.objects.bulk_create(batch)
+    event_ids = list(Event.objects.order_by('id').values_list('id', flat=True))
+    stdout(f"events: {len(event_ids)} in {time.monotonic() - started:.1f}s")
+
+    # Each user registers for a distinct sample of events, so pairs never repeat.
+    per_user, extra = divmod(registrations, max(1, len(user_ids)))
+
+    def pairs():
+        for position, user_id in enumerate(user_ids):
+            count = min(len(event_ids), per_user + (1 if position < extra else 0))
+            for event_id in rng.sample(event_ids, count):
+                yield Registration(event_id=event_id, user_id=user_id)
+
+    with transaction.atomic():
+        for batch in batched(pairs()):
+            Registration.objects.bulk_create(batch)
+    stdout(f"registrations: {Registration.objects.count()} in {time.monotonic() - started:.1f}s")
+
+    # Generated data may overfill capped events; counters still match the rows.
+    Event.objects.update(seats_taken=seat_counts())
+    search.rebuild_index()
+    stdout(f"done in {time.monotonic() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='bench.sqlite3', help="SQLite file to create.")
+    parser.add_argument('--events', type=int, default=100_000)
+    parser.add_argument('--users', type=int, default=50_000)
+    parser.add_argument('--registrations', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        parser.error(f"{args.db} already exists; remove it first.")
+    os.environ['DB_NAME'] = os.path.abspath(args.db)
+    setup_django()
+
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0)
+    generate(args.events, args.users, args.registrations, args.seed)
+
+
+if __name__ == '__main__':
+    main()
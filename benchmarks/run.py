@@ -0,0 +1,214 @@
+"""Drive every URL in eventflow/urls.py and report latency, queries and memory.
+
+    python -m benchmarks.run --db bench.sqlite3 [--requests 50] [--asgi]
+                             [--output results.json] [--baseline baseline.json] [--tolerance 0.2]
+
+Run benchmarks.datagen first to create the database. Each URL is requested
+once to warm caches and then --requests times; login-required views are
+requested as the organizer of the sample event, who is also registered for
+it. Results are written as JSON. With --baseline, p95 latency and queries
+per request are compared with an earlier run, and the exit status is 1 if
+either regressed by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+
+from benchmarks import setup_django
+
+# Writes, logouts and per-attendee PDF rendering of a whole event
+SKIP = {'logout', 'register_for_event', 'delete_event', 'export_tickets'}
+SAMPLE_ARGS = {'fmt': 'svg'}
+
+
+def peak_rss_kib():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return usage // 1024 if sys.platform == 'darwin' else usage
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def discover(patterns=None, seen=None):
+    """Yield (name, converters) for every named route, first definition wins."""
+    from django.urls import URLPattern, URLResolver, get_resolver
+
+    patterns = get_resolver().url_patterns if patterns is None else patterns
+    seen = set() if seen is None else seen
+    for entry in patterns:
+        if isinstance(entry, URLResolver):
+            if entry.app_name == 'admin':
+                continue
+            yield from discover(entry.url_patterns, seen)
+        elif isinstance(entry, URLPattern) and entry.name and entry.name not in seen:
+            seen.add(entry.name)
+            yield entry.name, entry.pattern.converters
+
+
+def sample_event():
+    from events.models import Event, Registration
+
+    # The busiest event in the first thousand, so per-attendee pages have rows
+    event = (
+        Event.objects.filter(pk__lte=1000).order_by('-seats_taken', 'pk').select_related('organizer').first()
+    )
+    if event is None:
+        raise SystemExit("The database has no events; run benchmarks.datagen first.")
+    Registration.objects.get_or_create(event=event, user=event.organizer)
+    return event
+
+
+def timed_get(client, url, loop=None):
+    """GET ``url``; async clients need the event ``loop`` to run on."""
+    from eventflow import instrumentation
+
+    stats = instrumentation.RequestStats()
+    token = instrumentation.current.set(stats)
+    try:
+        started = time.perf_counter()
+        if loop:
+            response = loop.run_until_complete(client.get(url))
+        else:
+            response = client.get(url)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        elapsed = time.perf_counter() - started
+    finally:
+        instrumentation.current.reset(token)
+    return response, elapsed, stats.queries
+
+
+def bench_url(url, clients, requests, loop=None):
+    from django.conf import settings
+    from django.shortcuts import resolve_url
+
+    response, _, _ = timed_get(clients['anonymous'], url, loop)
+    role = 'anonymous'
+    login_redirect = response.status_code == 302 and response.url.startswith(resolve_url(settings.LOGIN_URL))
+    if login_redirect or response.status_code == 401:
+        role = 'organizer'
+        response, _, _ = timed_get(clients[role], url, loop)
+
+    latencies, queries = [], []
+    for _ in range(requests):
+        response, elapsed, count = timed_get(clients[role], url, loop)
+        latencies.append(elapsed * 1000)
+        queries.append(count)
+    return {
+        'url': url,
+        'role': role,
+        'status': response.status_code,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'queries': max(queries),
+        'peak_rss_kib': peak_rss_kib(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print per-URL deltas against ``baseline``; return the regressed names."""
+    regressions = []
+    for name, current in results['urls'].items():
+        previous = baseline.get('urls', {}).get(name)
+        if not previous:
+            continue
+        latency = (current['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] if previous['p95_ms'] else 0.0
+        queries = current['queries'] - previous['queries']
+        regressed = latency > tolerance or queries > 0
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:<24} p95 {latency:+7.1%}  queries {queries:+d}{'  REGRESSED' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='bench.sqlite3')
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--asgi', action='store_true', help="Use the async test client (ASGI views).")
+    parser.add_argument('--no-page-cache', action='store_true', help="Measure cold paths (dummy cache).")
+    parser.add_argument('--only', nargs='*', help="URL names to run.")
+    parser.add_argument('--output', help="Write JSON results here.")
+    parser.add_argument('--baseline', help="Earlier JSON results to compare with.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed p95 slowdown (0.2 = 20%%).")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f"{args.db} does not exist; run benchmarks.datagen first.")
+    os.environ['DB_NAME'] = os.path.abspath(args.db)
+    setup_django()
+
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test import AsyncClient, Client
+    from django.urls import reverse
+    from events.models import Event, Registration
+
+    # Query counts come from the instrumentation context set around each request
+    settings.SQL_INSTRUMENTATION = False
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['testserver']
+    if args.no_page_cache:
+        settings.CACHES['default'] = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+
+    event = sample_event()
+    client_class = AsyncClient if args.asgi else Client
+    # One loop for the whole run, so loop start-up is not timed per request
+    loop = asyncio.new_event_loop() if args.asgi else None
+    # Errors are recorded as status 500 rather than aborting the run
+    clients = {role: client_class(raise_request_exception=False) for role in ('anonymous', 'organizer')}
+    clients['organizer'].force_login(event.organizer)
+
+    results = {
+        'python': platform.python_version(),
+        'mode': 'asgi' if args.asgi else 'wsgi',
+        'requests': args.requests,
+        'page_cache': not args.no_page_cache,
+        'dataset': {
+            'events': Event.objects.count(),
+            'users': User.objects.count(),
+            'registrations': Registration.objects.count(),
+        },
+        'sample_event': event.pk,
+        'urls': {},
+    }
+    for name, converters in discover():
+        if name in SKIP or (args.only and name not in args.only):
+            continue
+        kwargs = {key: SAMPLE_ARGS.get(key, event.pk) for key in converters}
+        result = bench_url(reverse(name, kwargs=kwargs), clients, args.requests, loop)
+        results['urls'][name] = result
+        print(f"{name:<24} {result['status']} {result['role']:<9} p50 {result['p50_ms']:8.2f}  "
+              f"p95 {result['p95_ms']:8.2f}  p99 {result['p99_ms']:8.2f} ms  {result['queries']:3d} queries")
+    results['peak_rss_kib'] = peak_rss_kib()
+    print(f"peak RSS: {results['peak_rss_kib'] / 1024:.1f} MiB")
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        print(f"compared with {args.baseline}:")
+        for key in ('mode', 'page_cache', 'dataset'):
+            if baseline.get(key) != results[key]:
+                print(f"  note: {key} differs: baseline {baseline.get(key)}, this run {results[key]}")
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
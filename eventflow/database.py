@@ -0,0 +1,97 @@
+from decouple import config
+
+
+# Database connection settings built from the environment, plus the SQLite
+# pragmas applied to every new connection.
+#
+#   DB_ENGINE=sqlite (default) | postgres
+#   DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
+#   DB_CONN_MAX_AGE  seconds to keep connections open (persistent connections)
+#   DB_POOL          use psycopg's connection pool on PostgreSQL
+#   DB_TUNING        set to False to skip the SQLite pragmas
+#   DB_REPLICAS      comma-separated replica SQLite files or PostgreSQL hosts,
+#                    exposed as the aliases replica1, replica2, ...
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,          # ms to wait on a locked database
+    'cache_size': -64000,          # negative = KiB, so 64 MB page cache
+    'mmap_size': 268435456,        # 256 MB memory-mapped I/O
+    'temp_store': 'MEMORY',
+}
+
+
+def get_databases(base_dir):
+    engine = config('DB_ENGINE', default='sqlite')
+    conn_max_age = config('DB_CONN_MAX_AGE', default=60, cast=int)
+
+    if engine in ('postgres', 'postgresql'):
+        pool = config('DB_POOL', default=False, cast=bool)
+        options = {}
+        if pool:
+            options['pool'] = {
+                'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+                'max_size': config('DB_POOL_MAX_SIZE', default=20, cast=int),
+            }
+        return {
+            'default': {
+                'ENGINE': 'django.db.backends.postgresql',
+                'NAME': config('DB_NAME', default='eventflow'),
+                'USER': config('DB_USER', default='eventflow'),
+                'PASSWORD': config('DB_PASSWORD', default=''),
+                'HOST': config('DB_HOST', default='localhost'),
+                'PORT': config('DB_PORT', default='5432'),
+                # The pool manages connection lifetime itself.
+                'CONN_MAX_AGE': 0 if pool else conn_max_age,
+                'CONN_HEALTH_CHECKS': True,
+                'OPTIONS': options,
+            }
+        }
+
+    return {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(base_dir / 'db.sqlite3')),
+            'CONN_MAX_AGE': conn_max_age,
+            'CONN_HEALTH_CHECKS': True,
+            # File-backed test database so concurrency tests see real locking
+            # (in-memory shared cache uses table locks that ignore busy_timeout).
+            'TEST': {'NAME': config('DB_TEST_NAME', default=str(base_dir / 'test_db.sqlite3'))},
+            'OPTIONS': {
+                # Take the write lock at BEGIN so concurrent writers queue on
+                # busy_timeout instead of failing with "database is locked".
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 5,
+            },
+        }
+    }
+
+
+def add_replicas(databases):
+    """Add a replicaN alias per DB_REPLICAS entry, cloned from 'default'."""
+    replicas = [name.strip() for name in config('DB_REPLICAS', default='').split(',') if name.strip()]
+    primary = databases['default']
+    for index, target in enumerate(replicas, start=1):
+        replica = dict(primary, OPTIONS=dict(primary.get('OPTIONS', {})))
+        if primary['ENGINE'].endswith('sqlite3'):
+            replica['NAME'] = target
+        else:
+            replica['HOST'] = target
+        # Tests run against the primary only.
+        replica['TEST'] = {'MIRROR': 'default'}
+        databases[f'replica{index}'] = replica
+    return databases
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created receiver applying SQLITE_PRAGMAS."""
+    from django.conf import settings
+
+    if connection.vendor != 'sqlite' or not getattr(settings, 'DB_TUNING', True):
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', SQLITE_PRAGMAS)
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            # In-memory test databases cannot switch to WAL; SQLite ignores it.
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,91 @@
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+# Primary/replica routing. Each request reads from one randomly picked
+# replica, so its queries see a single consistent copy, and writes go to
+# 'default'. Once a request writes, the client gets a short-lived cookie that
+# pins its following requests to the primary so it reads its own writes.
+
+PIN_COOKIE = 'pin_primary'
+
+pinned = ContextVar('pinned', default=False)
+# None outside a request, so writes from commands and shells do not pin.
+wrote = ContextVar('wrote', default=None)
+# The replica picked for the current request; None outside a request.
+replica = ContextVar('replica', default=None)
+
+
+def replica_aliases():
+    return [alias for alias in connections if alias.startswith('replica')]
+
+
+def pick_replica():
+    replicas = replica_aliases()
+    return random.choice(replicas) if replicas else None
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if pinned.get() or wrote.get():
+            return 'default'
+        # Commands and shells have no request, so each read picks again.
+        return replica.get() or pick_replica() or 'default'
+
+    def db_for_write(self, model, **hints):
+        if wrote.get() is not None:
+            wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaPinningMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        pin_token = pinned.set(PIN_COOKIE in request.COOKIES)
+        wrote_token = wrote.set(False)
+        replica_token = replica.set(None if pinned.get() else pick_replica())
+        try:
+            return self.pin(self.get_response(request))
+        finally:
+            pinned.reset(pin_token)
+            wrote.reset(wrote_token)
+            replica.reset(replica_token)
+
+    async def __acall__(self, request):
+        pin_token = pinned.set(PIN_COOKIE in request.COOKIES)
+        wrote_token = wrote.set(False)
+        replica_token = replica.set(None if pinned.get() else pick_replica())
+        try:
+            return self.pin(await self.get_response(request))
+        finally:
+            pinned.reset(pin_token)
+            wrote.reset(wrote_token)
+            replica.reset(replica_token)
+
+    def pin(self, response):
+        if wrote.get():
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
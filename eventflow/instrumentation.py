@@ -0,0 +1,170 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger('eventflow.sql')
+
+# Per-request SQL and template timing. A wrapper installed on every database
+# connection adds each query to the stats of the request running in the
+# current context, so queries made from sync_to_async threads under ASGI are
+# counted too. The middleware reports the totals as a Server-Timing header
+# and one JSON log line, and logs a warning for queries repeated often
+# enough to look like an N+1 loop.
+#
+# Responses that stream (CSV and ZIP exports) run their queries after the
+# middleware has returned, so those are not counted.
+
+current = ContextVar('sql_stats', default=None)
+
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    # ORM SQL already has placeholders instead of values; only IN lists vary.
+    return SPACE_RE.sub(' ', IN_LIST_RE.sub('IN (...)', sql)).strip()
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.rendering = 0
+        self.fingerprints = Counter()
+
+    def add(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Queries beyond the first for each repeated statement."""
+        return sum(count - 1 for count in self.fingerprints.values())
+
+    def repeated(self, threshold):
+        return {sql: count for sql, count in self.fingerprints.items() if count >= threshold}
+
+
+def record(execute, sql, params, many, context):
+    stats = current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add(sql, time.perf_counter() - started)
+
+
+def install(sender, connection, **kwargs):
+    """connection_created receiver adding ``record`` to the connection."""
+    if record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record)
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        stats = current.get()
+        if stats is None:
+            return self.template.render(context, request)
+        # Templates rendered from inside another one are already being timed
+        stats.rendering += 1
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats.rendering -= 1
+            if not stats.rendering:
+                stats.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend that adds render time to the request stats."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class QueryInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'SQL_N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.report(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.report(request, response, stats, time.perf_counter() - started)
+
+    def report(self, request, response, stats, elapsed):
+        metrics = [
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"',
+            f'tpl;dur={stats.template_time * 1000:.2f}',
+            f'total;dur={elapsed * 1000:.2f}',
+        ]
+        if stats.duplicates:
+            metrics.insert(1, f'db-dup;desc="{stats.duplicates} duplicate queries"')
+        response['Server-Timing'] = ', '.join(metrics)
+        response.sql_stats = stats
+
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': stats.queries,
+            'duplicates': stats.duplicates,
+            'db_ms': round(stats.db_time * 1000, 2),
+            'template_ms': round(stats.template_time * 1000, 2),
+            'total_ms': round(elapsed * 1000, 2),
+        }))
+        for sql, count in stats.repeated(self.threshold).items():
+            logger.warning(json.dumps({
+                'warning': 'possible N+1',
+                'path': request.path,
+                'count': count,
+                'sql': sql[:500],
+            }))
+        return response
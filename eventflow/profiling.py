@@ -0,0 +1,186 @@
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core import signing
+from django.http import Http404
+from django.shortcuts import render
+
+# On-demand cProfile capture of single requests. A request is profiled when
+#   - a staff user adds ?profile=1,
+#   - the X-Profile header (or ?profile=) carries a token from the staff
+#     page, signed and valid for PROFILE_TOKEN_MAX_AGE seconds, or
+#   - it is picked by 1-in-PROFILE_SAMPLE_RATE sampling (0 disables it).
+# Captures are kept in PROFILE_DIR as a ring buffer of PROFILE_KEEP entries
+# and listed on a staff-only page. Under ASGI only work on the event loop
+# thread is seen; sync_to_async threads are not profiled.
+
+HEADER = 'X-Profile'
+PARAM = 'profile'
+SALT = 'eventflow.profiling'
+ID_RE = re.compile(r'^[0-9]+-[0-9a-f]{8}$')
+TOP_FUNCTIONS = 40
+
+
+def profile_dir():
+    return Path(getattr(settings, 'PROFILE_DIR', Path(settings.BASE_DIR) / 'profiles'))
+
+
+def make_token():
+    return signing.TimestampSigner(salt=SALT).sign(uuid.uuid4().hex[:8])
+
+
+def valid_token(token):
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(token, max_age=getattr(settings, 'PROFILE_TOKEN_MAX_AGE', 3600))
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def requested_token(request):
+    return request.headers.get(HEADER) or request.GET.get(PARAM)
+
+
+def trigger(request, user=None):
+    """Why ``request`` should be profiled, or None."""
+    token = requested_token(request)
+    if token == '1':
+        if user is not None and user.is_staff:
+            return 'staff'
+    elif token and valid_token(token):
+        return 'token'
+    rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0)
+    if rate and random.randrange(rate) == 0:
+        return 'sample'
+    return None
+
+
+def save(profiler, meta):
+    """Write one capture and drop the oldest beyond PROFILE_KEEP. Returns its id."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    capture_id = f'{time.time_ns()}-{uuid.uuid4().hex[:8]}'
+
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    profiler.dump_stats(tmp)
+    os.replace(tmp, directory / f'{capture_id}.prof')
+    (directory / f'{capture_id}.json').write_text(json.dumps(meta))
+
+    keep = getattr(settings, 'PROFILE_KEEP', 50)
+    for stale in sorted(directory.glob('*.prof'), reverse=True)[keep:]:
+        stale.unlink(missing_ok=True)
+        stale.with_suffix('.json').unlink(missing_ok=True)
+    return capture_id
+
+
+def captures():
+    """Metadata of stored captures, newest first."""
+    entries = []
+    for path in sorted(profile_dir().glob('*.json'), reverse=True):
+        try:
+            meta = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        meta['id'] = path.stem
+        meta['captured'] = datetime.fromtimestamp(meta.get('captured_at', 0), tz=timezone.utc)
+        entries.append(meta)
+    return entries
+
+
+def top_functions(capture_id, limit=TOP_FUNCTIONS):
+    stats = pstats.Stats(str(profile_dir() / f'{capture_id}.prof'))
+    rows = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            'function': f'{name} ({os.path.basename(filename)}:{line})' if line else name,
+            'path': filename,
+            'calls': calls,
+            'tottime_ms': tottime * 1000,
+            'cumtime_ms': cumtime * 1000,
+        })
+    rows.sort(key=lambda row: row['cumtime_ms'], reverse=True)
+    return rows[:limit]
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        reason = trigger(request, getattr(request, 'user', None))
+        if reason is None:
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.store(request, response, profiler, reason, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        # Only load the user when a staff flag asks for it
+        user = await request.auser() if requested_token(request) == '1' else None
+        reason = trigger(request, user)
+        if reason is None:
+            return await self.get_response(request)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.store(request, response, profiler, reason, time.perf_counter() - started)
+
+    def store(self, request, response, profiler, reason, elapsed):
+        response['X-Profile-Id'] = save(profiler, {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+            'trigger': reason,
+            'captured_at': time.time(),
+        })
+        return response
+
+
+@staff_member_required
+def profile_list(request):
+    return render(request, 'profiling/list.html', {
+        'captures': captures(),
+        'token': make_token(),
+        'header': HEADER,
+    })
+
+
+@staff_member_required
+def profile_detail(request, capture_id):
+    if not ID_RE.match(capture_id) or not (profile_dir() / f'{capture_id}.prof').exists():
+        raise Http404
+    meta = next((entry for entry in captures() if entry['id'] == capture_id), {'id': capture_id})
+    return render(request, 'profiling/detail.html', {
+        'capture': meta,
+        'functions': top_functions(capture_id),
+    })
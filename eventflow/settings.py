@@ -2,6 +2,8 @@ import os
 from pathlib import Path
 from decouple import config
 
+from .database import add_replicas, get_databases
+
 
 # Build paths inside the project
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -27,23 +29,39 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost so session and auth queries are counted (see SQL_INSTRUMENTATION)
+    'eventflow.instrumentation.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Static files are answered before sessions and auth are touched
+    'eventflow.staticfiles.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'eventflow.db_router.ReplicaPinningMiddleware',
+    'eventflow.profiling.ProfilingMiddleware',
+    'eventflow.middleware.AsyncUrlconfMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'eventflow.urls'
+# Served to ASGI requests instead, with async versions of the read views
+ASYNC_URLCONF = 'eventflow.urls_async'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to the SQL instrumentation
+        'BACKEND': 'eventflow.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],  #  Global templates folder
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Parse each template once per process, in DEBUG too
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -58,12 +76,12 @@ TEMPLATES = [
 WSGI_APPLICATION = 'eventflow.wsgi.application'
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+# SQLite by default; see eventflow/database.py for the env switches
+DATABASES = add_replicas(get_databases(BASE_DIR))
+DATABASE_ROUTERS = ['eventflow.db_router.PrimaryReplicaRouter']
+# Seconds a user reads from the primary after one of their requests wrote
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+DB_TUNING = config('DB_TUNING', default=True, cast=bool)
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -84,10 +102,24 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = config('STATIC_ROOT', default=os.path.join(BASE_DIR, 'staticfiles'))
+# Hashed names plus .gz/.br variants, written by collectstatic
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'eventflow.staticfiles.CompressedManifestStaticFilesStorage'},
+}
+# Served by eventflow.staticfiles.StaticFilesMiddleware; turn off behind a CDN
+SERVE_STATIC = config('SERVE_STATIC', default=True, cast=bool)
+# Cache lifetime for unhashed names; hashed ones are immutable
+STATIC_MAX_AGE = config('STATIC_MAX_AGE', default=60, cast=int)
 
 #  Media files (Uploaded user files)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Hand media transfers to the front-end server: '', 'x-accel-redirect' or 'x-sendfile'
+MEDIA_ACCEL = config('MEDIA_ACCEL', default='')
+# nginx internal location aliased to MEDIA_ROOT, for x-accel-redirect
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
 
 #  Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -116,3 +148,78 @@ DEBUG = config('DEBUG', default=False, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 
+
+# Home feed keyset pagination
+EVENTS_PAGE_SIZE = config('EVENTS_PAGE_SIZE', default=12, cast=int)
+
+# Email outbox worker (python manage.py send_queued_mail --loop)
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=50, cast=int)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_OUTBOX_BACKOFF_SECONDS = config('EMAIL_OUTBOX_BACKOFF_SECONDS', default=60, cast=int)
+# How long a worker owns the messages it claimed before others may retry them
+EMAIL_OUTBOX_LEASE_SECONDS = config('EMAIL_OUTBOX_LEASE_SECONDS', default=300, cast=int)
+
+# Rendered ticket PDF cache
+TICKET_CACHE_DIR = config('TICKET_CACHE_DIR', default=os.path.join(BASE_DIR, 'ticket_cache'))
+TICKET_PRERENDER = config('TICKET_PRERENDER', default=False, cast=bool)
+TICKET_EXPORT_WORKERS = config('TICKET_EXPORT_WORKERS', default=0, cast=int)  # 0 = one per CPU
+# Rendering processes for the web export view; 1 renders in the request thread
+TICKET_EXPORT_WEB_WORKERS = config('TICKET_EXPORT_WEB_WORKERS', default=1, cast=int)
+
+# Public base URL encoded in QR codes and tickets (defaults to the request host;
+# required by the export_tickets command)
+SITE_URL = config('SITE_URL', default='')
+
+# Cache backend: Redis when REDIS_URL is set, file-based when CACHE_DIR is set,
+# otherwise per-process local memory.
+REDIS_URL = config('REDIS_URL', default='')
+CACHE_DIR = config('CACHE_DIR', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'eventflow',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Per-request query count, DB and template time as a Server-Timing header and
+# JSON lines on the eventflow.sql logger; statements repeated this many times
+# in one request are logged as a possible N+1.
+SQL_INSTRUMENTATION = config('SQL_INSTRUMENTATION', default=DEBUG, cast=bool)
+SQL_N_PLUS_ONE_THRESHOLD = config('SQL_N_PLUS_ONE_THRESHOLD', default=5, cast=int)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'eventflow.sql': {
+            'handlers': ['console'],
+            'level': config('SQL_LOG_LEVEL', default='WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# On-demand request profiling (see eventflow/profiling.py)
+PROFILE_DIR = config('PROFILE_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+PROFILE_KEEP = config('PROFILE_KEEP', default=50, cast=int)
+PROFILE_SAMPLE_RATE = config('PROFILE_SAMPLE_RATE', default=0, cast=int)  # profile 1 in N requests
+PROFILE_TOKEN_MAX_AGE = config('PROFILE_TOKEN_MAX_AGE', default=3600, cast=int)
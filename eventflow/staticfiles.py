@@ -0,0 +1,191 @@
+import gzip
+import mimetypes
+import os
+from email.utils import formatdate
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip variants are written
+    brotli = None
+
+# Static pipeline. collectstatic writes content-hashed copies of every file
+# (styles.3f2a9c1b0d4e.css) plus a manifest, and next to each compressible
+# file a .gz and, when the brotli package is installed, a .br variant.
+# StaticFilesMiddleware serves STATIC_ROOT from the app process: it picks
+# the best variant the client accepts and marks hashed names as
+# immutable for a year, since a changed file gets a new name.
+
+COMPRESSIBLE = (
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.xml', '.html', '.ico', '.ttf', '.otf', '.eot',
+)
+# Below this, headers outweigh the saving
+MIN_COMPRESS_SIZE = 256
+# A variant must save at least 5% to be worth a separate file
+MAX_COMPRESS_RATIO = 0.95
+IMMUTABLE = 'public, max-age=31536000, immutable'
+DEFAULT_MAX_AGE = 60
+
+
+def encoders():
+    """(encoding, suffix, compress) for each variant this install can write."""
+    available = [('gzip', '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        available.insert(0, ('br', '.br', lambda data: brotli.compress(data, quality=11)))
+    return available
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Collected files missing from the manifest are hashed on the fly
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(paths) | set(self.hashed_files.values())):
+            if name.endswith(COMPRESSIBLE):
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as handle:
+            data = handle.read()
+        for _, suffix, compress in encoders():
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+            if len(data) < MIN_COMPRESS_SIZE:
+                continue
+            compressed = compress(data)
+            if len(compressed) <= len(data) * MAX_COMPRESS_RATIO:
+                with open(path + suffix, 'wb') as handle:
+                    handle.write(compressed)
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Nothing collected yet (development, tests): link the plain
+            # name. A file missing from a built manifest is a deploy error.
+            if settings.DEBUG or not self.manifest_storage.exists(self.manifest_name):
+                return name
+            raise
+
+
+def accepted_encodings(header):
+    """Content codings ``header`` allows, ignoring ones with q=0."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        quality = params.strip().lower()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.path = path
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.last_modified = stat.st_mtime
+        self.cache_control = IMMUTABLE if immutable else (
+            f'public, max-age={getattr(settings, "STATIC_MAX_AGE", DEFAULT_MAX_AGE)}'
+        )
+        # (encoding, path, size, etag), best first; identity is always last
+        etag = f'{stat.st_size:x}-{int(stat.st_mtime):x}'
+        self.variants = []
+        for encoding, suffix, _ in encoders():
+            if os.path.exists(path + suffix):
+                self.variants.append((encoding, path + suffix, os.path.getsize(path + suffix), f'"{etag}-{encoding}"'))
+        self.variants.append((None, path, stat.st_size, f'"{etag}"'))
+
+    def choose(self, accept_encoding):
+        accepted = accepted_encodings(accept_encoding) if accept_encoding else set()
+        for variant in self.variants:
+            if variant[0] is None or variant[0] in accepted:
+                return variant
+
+    def serve(self, request):
+        encoding, path, size, etag = self.choose(request.headers.get('Accept-Encoding', ''))
+        response = get_conditional_response(request, etag=etag, last_modified=int(self.last_modified))
+        if response is None:
+            if request.method == 'HEAD':
+                response = HttpResponse(content_type=self.content_type)
+            else:
+                response = FileResponse(open(path, 'rb'), content_type=self.content_type)
+                del response['Content-Disposition']
+            response['Content-Length'] = size
+            response['Last-Modified'] = formatdate(self.last_modified, usegmt=True)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Cache-Control'] = self.cache_control
+        if len(self.variants) > 1:
+            response['Vary'] = 'Accept-Encoding'
+        return response
+
+
+def collected_files(root):
+    """Map URL paths below STATIC_URL to StaticFile for everything in ``root``."""
+    hashed = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            if not name.endswith(('.gz', '.br')):
+                files[name] = StaticFile(path, immutable=name in hashed)
+    return files
+
+
+class StaticFilesMiddleware:
+    """Serve collected files from STATIC_ROOT with compression and caching.
+
+    The directory is indexed once at start-up, so run collectstatic before
+    starting the server. Set SERVE_STATIC = False when a front-end server
+    or CDN serves STATIC_URL instead.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        url = urlsplit(settings.STATIC_URL or '')
+        if not getattr(settings, 'SERVE_STATIC', True) or not settings.STATIC_ROOT or url.netloc:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = url.path
+        self.files = collected_files(settings.STATIC_ROOT) if os.path.isdir(settings.STATIC_ROOT) else {}
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def find(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefix):
+            return None
+        return self.files.get(request.path_info[len(self.prefix):])
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        static_file = self.find(request)
+        if static_file is not None:
+            return static_file.serve(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        static_file = self.find(request)
+        if static_file is not None:
+            return static_file.serve(request)
+        return await self.get_response(request)
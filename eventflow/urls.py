@@ -1,12 +1,12 @@
 from django.contrib import admin
 from django.urls import path
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 
 from events import views as event_views
 from events.views import CustomLoginView
-from events import views
+from events import api, ical, media, views
+from eventflow import profiling
 from django.urls import path, include
 
 
@@ -21,11 +21,24 @@ urlpatterns = [
     # Event Operations
     path('create/', event_views.create_event, name='create_event'),
     path('event/<int:event_id>/', event_views.event_detail, name='event_detail'),
+    path('event/<int:event_id>/qr.<str:fmt>', event_views.event_qr, name='event_qr'),
     path('event/<int:event_id>/download-ticket/', event_views.download_ticket, name='download_ticket'),
     path('event/<int:event_id>/update/', event_views.update_event, name='update_event'),
     path('event/<int:event_id>/delete/', event_views.delete_event, name='delete_event'),
     path('event/<int:event_id>/register/', event_views.register_for_event, name='register_for_event'),
     path('event/<int:event_id>/registrations/', event_views.view_registrations, name='view_registrations'),
+    path('event/<int:event_id>/registrations.csv', event_views.export_registrations, name='export_registrations'),
+    path('event/<int:event_id>/tickets.zip', event_views.export_tickets, name='export_tickets'),
+    path('event/<int:event_id>/event.ics', ical.event_download, name='event_ical'),
+    # Calendar feed of a user's registrations, behind a signed token
+    path('calendar/<str:token>.ics', ical.user_feed, name='ical_feed'),
+    # JSON API
+    path('api/events/', api.event_list, name='api_event_list'),
+    path('api/events/<int:event_id>/', api.event_detail, name='api_event_detail'),
+    path('api/me/registrations/', api.my_registrations, name='api_my_registrations'),
+    # Staff-only request profiles
+    path('profiles/', profiling.profile_list, name='profile_list'),
+    path('profiles/<str:capture_id>/', profiling.profile_detail, name='profile_detail'),
     # Authentication
     path('signup/', event_views.signup_view, name='signup'),
     path('login/', CustomLoginView.as_view(template_name='accounts/login.html'), name='login'),
@@ -42,6 +55,7 @@ urlpatterns = [
      
 ]
 
-#  Serve media files during development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+#  Media files, with access checks (see events/media.py)
+urlpatterns += [
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>', media.serve_media, name='media'),
+]
@@ -0,0 +1,16 @@
+from django.urls import include, path
+
+from events import async_views
+
+# URLconf used for ASGI requests (see eventflow.middleware.AsyncUrlconfMiddleware).
+# The async views shadow their sync counterparts under the same names; every
+# other route falls through to eventflow.urls.
+
+urlpatterns = [
+    path('', async_views.home, name='home'),
+    path('event/<int:event_id>/', async_views.event_detail, name='event_detail'),
+    path('event/<int:event_id>/download-ticket/', async_views.download_ticket, name='download_ticket'),
+    path('event/<int:event_id>/register/', async_views.register_for_event, name='register_for_event'),
+    path('my-registrations/', async_views.my_registrations, name='my_registrations'),
+    path('', include('eventflow.urls')),
+]
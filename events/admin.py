@@ -1,13 +1,25 @@
 from django.contrib import admin
-from .models import Event, UserProfile
+from .models import Event, OutboundEmail, Registration, UserProfile
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
-    list_display = ('title', 'date', 'organizer')
+    list_display = ('title', 'date', 'organizer', 'capacity', 'seats_taken')
     list_filter = ('date', 'organizer')
     search_fields = ('title', 'location', 'address', 'organizer__username')
 
+@admin.register(Registration)
+class RegistrationAdmin(admin.ModelAdmin):
+    list_display = ('event', 'user', 'registered_at')
+    raw_id_fields = ('event', 'user')
+    search_fields = ('event__title', 'user__username', 'user__email')
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'phone')
     search_fields = ('user__username', 'user__email', 'phone')
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject',)
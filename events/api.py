@@ -0,0 +1,139 @@
+import hashlib
+
+from django.http import Http404, HttpResponseNotModified, JsonResponse
+from django.utils import timezone
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET
+
+from . import page_cache
+from .filters import filter_events
+from .models import Event
+from .pagination import get_page_size, paginate_events
+
+# Read-only JSON API. ETags are derived from the page cache versions, so a
+# matching If-None-Match is answered with 304 before any query or serialization.
+
+API_MAX_PAGE_SIZE = 1000
+
+# Public field name -> model fields loaded for it
+FIELDS = {
+    'id': ['id'],
+    'title': ['title'],
+    'description': ['description'],
+    'date': ['date'],
+    'time': ['time'],
+    'location': ['location'],
+    'address': ['address'],
+    'map_link': ['map_link'],
+    'image': ['image'],
+    'organizer': ['organizer__username'],
+    'capacity': ['capacity'],
+}
+LIST_FIELDS = ['id', 'title', 'date', 'time', 'location', 'address', 'image', 'organizer']
+DETAIL_FIELDS = list(FIELDS)
+
+
+def selected_fields(request, default):
+    requested = request.GET.get('fields')
+    if not requested:
+        return default
+    fields = [name for name in requested.split(',') if name in FIELDS]
+    return fields or default
+
+
+def project(queryset, fields, extra=()):
+    # id and date are always needed for keyset cursors
+    columns = {'id', 'date', *extra}
+    for name in fields:
+        columns.update(FIELDS[name])
+    if 'organizer' in fields:
+        queryset = queryset.select_related('organizer')
+    return queryset.only(*columns)
+
+
+def serialize(event, fields):
+    data = {}
+    for name in fields:
+        if name == 'organizer':
+            data[name] = event.organizer.username
+        elif name == 'image':
+            data[name] = event.image.url if event.image else None
+        elif name in ('date', 'time'):
+            data[name] = getattr(event, name).isoformat()
+        else:
+            data[name] = getattr(event, name)
+    return data
+
+
+def etag_for(*parts):
+    return '"' + hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest() + '"'
+
+
+def conditional(request, etag, build):
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(build())
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def page_payload(request, queryset, fields):
+    page = paginate_events(
+        project(queryset, fields),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=get_page_size(request, max_size=API_MAX_PAGE_SIZE),
+    )
+    return {
+        'results': [serialize(event, fields) for event in page],
+        'next': page.next_cursor,
+        'previous': page.prev_cursor,
+    }
+
+
+@require_GET
+def event_list(request):
+    fields = selected_fields(request, LIST_FIELDS)
+    etag = etag_for(
+        'list', page_cache.get_version(page_cache.FEED), timezone.localdate(), request.GET.urlencode()
+    )
+    return conditional(
+        request, etag,
+        lambda: page_payload(request, filter_events(Event.objects.all(), request.GET), fields),
+    )
+
+
+@require_GET
+def event_detail(request, event_id):
+    fields = selected_fields(request, DETAIL_FIELDS)
+    etag = etag_for(
+        'detail', event_id, page_cache.get_version(page_cache.event_scope(event_id)),
+        request.GET.urlencode(),
+    )
+
+    def build():
+        try:
+            event = project(Event.objects.all(), fields, extra=['capacity', 'seats_taken']).get(pk=event_id)
+        except Event.DoesNotExist:
+            raise Http404
+        data = serialize(event, fields)
+        data['seats_left'] = event.seats_left
+        return data
+
+    return conditional(request, etag, build)
+
+
+@require_GET
+def my_registrations(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication required.'}, status=401)
+    fields = selected_fields(request, LIST_FIELDS)
+    etag = etag_for(
+        'registrations', request.user.pk,
+        page_cache.get_version(page_cache.user_scope(request.user.pk)),
+        page_cache.get_version(page_cache.FEED), timezone.localdate(), request.GET.urlencode(),
+    )
+    events = filter_events(Event.objects.filter(registrations__user=request.user), request.GET)
+    return conditional(request, etag, lambda: page_payload(request, events, fields))
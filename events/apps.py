@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class EventsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'events'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from eventflow import instrumentation
+        from eventflow.database import configure_sqlite
+        from . import signals  # noqa: F401
+
+        connection_created.connect(configure_sqlite, dispatch_uid='eventflow.configure_sqlite')
+        connection_created.connect(instrumentation.install, dispatch_uid='eventflow.instrument_queries')
@@ -0,0 +1,143 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404
+from django.shortcuts import redirect, render
+
+from . import ical, page_cache, qr, registrations, tickets
+from .conditional import conditional_page, event_validators, home_validators, ticket_validators
+from .filters import filter_events
+from .models import Event, Registration, WaitlistEntry
+from .pagination import apaginate_events, get_page_size, page_url
+
+# Native async versions of the read-heavy views, served instead of the ones in
+# views.py when the site runs under ASGI (see eventflow.urls_async). Queries
+# go through the async ORM; template rendering, PDF drawing and anything that
+# needs a transaction run in worker threads so the event loop never blocks.
+
+arender = sync_to_async(render)
+
+
+async def get_event_or_404(queryset, event_id):
+    try:
+        return await queryset.aget(id=event_id)
+    except Event.DoesNotExist:
+        raise Http404("No Event matches the given query.")
+
+
+@conditional_page(home_validators)
+async def home(request):
+    # Resolve the lazy user once here; templates then never touch the session.
+    request.user = await request.auser()
+    if page_cache.is_cacheable(request):
+        return await page_cache.acached_response(
+            lambda: page_cache.feed_key(request), lambda: render_home(request)
+        )
+    return await render_home(request)
+
+
+async def render_home(request):
+    query = request.GET.get('q', '')
+    sort = request.GET.get('sort', '')
+    ranked = bool(query and sort == 'relevance')
+    # Ranked FTS searches look up the match order eagerly, so build in a thread.
+    events = await sync_to_async(filter_events)(Event.objects.all(), request.GET, ranked=ranked)
+
+    if ranked:
+        events = [event async for event in events[:get_page_size(request)]]
+        await page_cache.aattach_versions(events)
+        return await arender(request, 'home.html', {'events': events, 'cache_timeout': page_cache.timeout()})
+
+    page = await apaginate_events(
+        events,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=get_page_size(request),
+    )
+    await page_cache.aattach_versions(page.items)
+    return await arender(request, 'home.html', {
+        'events': page,
+        'page': page,
+        'cache_timeout': page_cache.timeout(),
+        'next_url': page_url(request, after=page.next_cursor) if page.has_next else None,
+        'prev_url': page_url(request, before=page.prev_cursor) if page.has_previous else None,
+    })
+
+
+@conditional_page(event_validators)
+async def event_detail(request, event_id):
+    request.user = await request.auser()
+    if page_cache.is_cacheable(request):
+        return await page_cache.acached_response(
+            lambda: page_cache.event_page_key(event_id), lambda: render_event_detail(request, event_id)
+        )
+    return await render_event_detail(request, event_id)
+
+
+async def render_event_detail(request, event_id):
+    key = await page_cache.amake_key('event-obj', [page_cache.event_scope(event_id)], event_id)
+    event = await page_cache.aget_or_build(
+        key, lambda: get_event_or_404(Event.objects.select_related('organizer'), event_id)
+    )
+    user = request.user
+    is_registered = is_waitlisted = False
+    if user.is_authenticated:
+        is_registered = await Registration.objects.filter(event_id=event.pk, user_id=user.pk).aexists()
+        if not is_registered and event.capacity is not None:
+            is_waitlisted = await WaitlistEntry.objects.filter(event_id=event.pk, user_id=user.pk).aexists()
+    return await arender(request, 'event_detail.html', {
+        'event': event,
+        'is_registered': is_registered,
+        'is_waitlisted': is_waitlisted,
+    })
+
+
+@login_required
+async def my_registrations(request):
+    user = await request.auser()
+    request.user = user
+    events = [event async for event in user.registered_events.order_by('-date').aiterator()]
+    return await arender(request, 'my_registrations.html', {
+        'events': events,
+        'feed_url': ical.feed_url(request, user),
+    })
+
+
+@login_required
+async def register_for_event(request, event_id):
+    user = await request.auser()
+    event = await get_event_or_404(Event.objects.all(), event_id)
+
+    # Seat claiming and the outbox row share a transaction, which needs a thread.
+    result = await sync_to_async(registrations.register_and_notify)(event, user)
+    if result == registrations.ALREADY_REGISTERED:
+        messages.info(request, "You are already registered for this event.")
+    elif result == registrations.ALREADY_WAITLISTED:
+        messages.info(request, "You are already on the waitlist for this event.")
+    elif result == registrations.WAITLISTED:
+        messages.warning(request, "This event is full. You have been added to the waitlist.")
+    else:
+        messages.success(request, "You have successfully registered for the event.")
+        if getattr(settings, 'TICKET_PRERENDER', False):
+            # Rendering is pure CPU and file I/O, so it may use any thread.
+            await sync_to_async(tickets.get_ticket, thread_sensitive=False)(event, user, qr.base_url(request))
+
+    return redirect('event_detail', event_id=event.id)
+
+
+@login_required
+@conditional_page(ticket_validators)
+async def download_ticket(request, event_id):
+    user = await request.auser()
+    event = await get_event_or_404(Event.objects.all(), event_id)
+
+    if not await Registration.objects.filter(event_id=event.pk, user_id=user.pk).aexists():
+        messages.error(request, "You are not registered for this event.")
+        return redirect('event_detail', event_id=event.id)
+
+    # Rendering and opening the file are blocking I/O, so both run in a thread.
+    handle = await sync_to_async(tickets.open_ticket, thread_sensitive=False)(event, user, qr.base_url(request))
+    response = FileResponse(handle, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{event.title}_ticket.pdf"'
+    return response
@@ -0,0 +1,112 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+
+from . import page_cache, qr, tickets
+from .models import Event, Registration
+
+
+# Conditional GET for HTML pages. Each page has validators that cost one
+# primary-key lookup or a cache read (Event.version and updated_at, the page
+# cache feed version), so revalidating an unchanged page answers 304 without
+# rendering it. Responses carry Cache-Control: no-cache, so browsers always
+# revalidate instead of reusing a copy for a heuristic lifetime.
+
+
+def conditional_page(validators):
+    """condition()-style decorator taking one ``validators`` callable.
+
+    ``validators(request, *args, **kwargs)`` returns (etag, last_modified)
+    or None to let the view respond as usual, e.g. for missing objects. It
+    is sync; async views run it in a thread. Requests with pending flash
+    messages are never answered with 304, so the messages are shown.
+    """
+    def check(request, args, kwargs):
+        if request.method not in ('GET', 'HEAD') or 'messages' in request.COOKIES:
+            return None
+        found = validators(request, *args, **kwargs)
+        if found is None:
+            return None
+        etag, last_modified = found
+        return quote_etag(etag), last_modified, request.user.is_authenticated
+
+    def not_modified(request, found):
+        etag, last_modified, _ = found
+        return get_conditional_response(
+            request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+
+    def finish(response, found):
+        if found is None or response.status_code not in (200, 304):
+            return response
+        etag, last_modified, private = found
+        response.headers.setdefault('ETag', etag)
+        if last_modified and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        patch_cache_control(response, no_cache=True, **({'private': True} if private else {}))
+        return response
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def inner(request, *args, **kwargs):
+                found = await sync_to_async(check)(request, args, kwargs)
+                response = not_modified(request, found) if found else None
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return finish(response, found)
+        else:
+            @wraps(view)
+            def inner(request, *args, **kwargs):
+                found = check(request, args, kwargs)
+                response = not_modified(request, found) if found else None
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                return finish(response, found)
+        return inner
+
+    return decorator
+
+
+def home_validators(request):
+    # The feed version is bumped by every event save or delete
+    key = f'{page_cache.feed_key(request)}|{request.user.pk}'
+    return 'home-' + hashlib.sha1(key.encode()).hexdigest()[:20], None
+
+
+def event_exists(event_id):
+    # Cached under the event's version, which saves and deletes bump
+    key = page_cache.make_key('event-exists', [page_cache.event_scope(event_id)], event_id)
+    return page_cache.get_or_build(key, lambda: Event.objects.filter(pk=event_id).exists())
+
+
+def event_validators(request, event_id):
+    if page_cache.is_cacheable(request):
+        # Anonymous pages come from the page cache, so its key is a validator
+        # that needs no query once the event is known to exist. A missing one
+        # must not match If-None-Match: *.
+        if not event_exists(event_id):
+            return None
+        return 'event-' + hashlib.sha1(page_cache.event_page_key(event_id).encode()).hexdigest()[:20], None
+    state = Event.objects.filter(pk=event_id).values_list('version', 'updated_at').first()
+    if state is None:
+        return None
+    version, updated_at = state
+    # Logged-in pages differ per user (registration and waitlist state, nav)
+    return f'event-{event_id}-{version}-{request.user.pk or 0}', updated_at
+
+
+def ticket_validators(request, event_id):
+    if not request.user.is_authenticated:
+        return None
+    registration = (
+        Registration.objects.filter(event_id=event_id, user=request.user).select_related('event').first()
+    )
+    if registration is None:
+        return None
+    # Tickets are keyed by the fields printed on them, so seat changes keep the ETag
+    key = tickets.ticket_key(registration.event, request.user, qr.base_url(request))
+    return key, registration.event.updated_at
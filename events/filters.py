@@ -0,0 +1,18 @@
+from django.utils import timezone
+
+from .search import search_events
+
+
+# Query-string filters shared by the home page and the JSON API
+def filter_events(queryset, params, ranked=False):
+    query = params.get('q', '')
+    date_filter = params.get('date', '')
+
+    if date_filter == 'upcoming':
+        queryset = queryset.filter(date__gte=timezone.now().date())
+    elif date_filter == 'past':
+        queryset = queryset.filter(date__lt=timezone.now().date())
+
+    if query:
+        queryset = search_events(queryset, query, ranked=ranked)
+    return queryset
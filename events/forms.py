@@ -12,6 +12,7 @@ class EventForm(forms.ModelForm):
             'date',
             'time',
             'address',
+            'capacity',
             'map_link',
             'image',
             'pdf'
@@ -22,6 +23,7 @@ class EventForm(forms.ModelForm):
             'date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
             'time': forms.TimeInput(attrs={'type': 'time', 'class': 'form-control'}),
             'address': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
+            'capacity': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
             'map_link': forms.URLInput(attrs={'class': 'form-control'}),
             'image': forms.ClearableFileInput(attrs={'class': 'form-control'}),
             'pdf': forms.ClearableFileInput(attrs={'class': 'form-control'}),
@@ -0,0 +1,174 @@
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import urlsplit
+
+from django.core import signing
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_etags
+
+from . import page_cache, qr
+from .models import Event, Registration
+
+
+# iCalendar (RFC 5545) exports: a per-user feed of registered events behind a
+# signed URL token, for calendar apps to poll, and a download per event.
+#
+# Feeds are assembled from per-event VEVENT blocks cached under the event's
+# page cache version, so an edit re-renders one block and every feed picks it
+# up. The user's event ids are cached under the user's version, which
+# registration changes bump. The ETag is a digest of those versions, so a
+# poll of an unchanged feed is answered with 304 from the cache alone.
+
+SALT = 'eventflow.ical'
+CONTENT_TYPE = 'text/calendar; charset=utf-8'
+PRODID = '-//EventFlow//Events//EN'
+LINE_LIMIT = 75
+
+
+def feed_token(user_id):
+    return signing.Signer(salt=SALT).sign(str(user_id))
+
+
+def token_user_id(token):
+    try:
+        return int(signing.Signer(salt=SALT).unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def feed_url(request, user):
+    return request.build_absolute_uri(reverse('ical_feed', args=[feed_token(user.pk)]))
+
+
+def escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Split ``line`` into CRLF-joined pieces of at most 75 octets."""
+    encoded = line.encode()
+    if len(encoded) <= LINE_LIMIT:
+        return line + '\r\n'
+    pieces, current, size, limit = [], '', 0, LINE_LIMIT
+    for char in line:
+        width = len(char.encode())
+        if size + width > limit:
+            pieces.append(current)
+            # Continuation lines start with a space, which counts
+            current, size, limit = '', 0, LINE_LIMIT - 1
+        current += char
+        size += width
+    pieces.append(current)
+    return '\r\n '.join(pieces) + '\r\n'
+
+
+def utc_stamp(moment):
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def vevent(event, base):
+    starts = timezone.make_aware(datetime.combine(event.date, event.time))
+    location = ', '.join(part for part in (event.address, event.location) if part)
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:event-{event.pk}@{urlsplit(base).hostname or "eventflow"}',
+        f'DTSTAMP:{utc_stamp(event.updated_at)}',
+        f'LAST-MODIFIED:{utc_stamp(event.updated_at)}',
+        f'SEQUENCE:{event.version}',
+        f'DTSTART:{utc_stamp(starts)}',
+        f'SUMMARY:{escape(event.title)}',
+        f'DESCRIPTION:{escape(event.description)}',
+        f'LOCATION:{escape(location)}',
+        f'URL:{qr.event_url(event.pk, base)}',
+        'END:VEVENT',
+    ]
+    return ''.join(fold(line) for line in lines)
+
+
+def calendar(blocks, name=None):
+    header = ['BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN', 'METHOD:PUBLISH']
+    if name:
+        header.append(f'X-WR-CALNAME:{escape(name)}')
+    return ''.join(fold(line) for line in header) + ''.join(blocks) + fold('END:VCALENDAR')
+
+
+def block_key(event_id, version, base):
+    digest = hashlib.sha1(base.encode()).hexdigest()[:12]
+    return f'pc:ics:{version}:{event_id}:{digest}'
+
+
+def event_versions(event_ids):
+    versions = cache.get_many([page_cache.version_key(page_cache.event_scope(pk)) for pk in event_ids])
+    return {
+        pk: versions.get(page_cache.version_key(page_cache.event_scope(pk)))
+        or page_cache.get_version(page_cache.event_scope(pk))
+        for pk in event_ids
+    }
+
+
+def vevents(event_ids, versions, base):
+    """VEVENT blocks for ``event_ids``, rendering only the ones not cached."""
+    keys = {pk: block_key(pk, versions[pk], base) for pk in event_ids}
+    found = cache.get_many(list(keys.values()))
+    missing = [pk for pk in event_ids if keys[pk] not in found]
+    if missing:
+        built = {keys[event.pk]: vevent(event, base) for event in Event.objects.filter(pk__in=missing)}
+        cache.set_many(built, page_cache.timeout())
+        found.update(built)
+    # Events deleted since the ids were cached are simply left out
+    return [found[keys[pk]] for pk in event_ids if keys[pk] in found]
+
+
+def registered_event_ids(user_id):
+    key = page_cache.make_key('ics-ids', [page_cache.user_scope(user_id)], user_id)
+    return page_cache.get_or_build(key, lambda: list(
+        Registration.objects.filter(user_id=user_id).order_by('event_id').values_list('event_id', flat=True)
+    ))
+
+
+def respond(request, etag, build, cache_control, filename=None):
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(build(), content_type=CONTENT_TYPE)
+        if filename:
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def user_feed(request, token):
+    user_id = token_user_id(token)
+    if user_id is None:
+        raise Http404
+    base = qr.base_url(request)
+    event_ids = registered_event_ids(user_id)
+    versions = event_versions(event_ids)
+    parts = [user_id, page_cache.get_version(page_cache.user_scope(user_id)), base]
+    parts += [f'{pk}.{versions[pk]}' for pk in event_ids]
+    etag = '"' + hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest() + '"'
+    return respond(
+        request, etag, lambda: calendar(vevents(event_ids, versions, base), name='EventFlow'),
+        'private, no-cache',
+    )
+
+
+def event_download(request, event_id):
+    base = qr.base_url(request)
+    versions = event_versions([event_id])
+    etag = '"' + hashlib.sha1(f'{event_id}|{versions[event_id]}|{base}'.encode()).hexdigest() + '"'
+
+    def build():
+        blocks = vevents([event_id], versions, base)
+        if not blocks:
+            raise Http404
+        return calendar(blocks)
+
+    return respond(request, etag, build, 'public, no-cache', filename=f'event-{event_id}.ics')
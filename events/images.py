@@ -0,0 +1,110 @@
+import hashlib
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+
+# Resized, recompressed variants of uploaded images (event images and
+# avatars). Originals are kept untouched; variants live next to them under
+# derivatives/ and are referenced from templates through srcset. The widths
+# built for each image are cached when the build finishes, so rendering a
+# page never asks the storage which variants exist.
+
+WIDTHS = (160, 320, 640, 1280)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# One background thread keeps encoding off the request path without letting
+# a burst of uploads saturate the CPU.
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-derivatives')
+# Images without variants are rechecked after this long, in case another
+# process built them
+PENDING_TIMEOUT = 60
+
+
+def variant_name(name, width, ext):
+    stem, _ = posixpath.splitext(name)
+    return f'derivatives/{stem}-{width}w.{ext}'
+
+
+def widths_key(name):
+    return 'img:widths:' + hashlib.sha1(name.encode()).hexdigest()
+
+
+def available_widths(name, storage=default_storage):
+    """Widths whose variants exist, as recorded by build_derivatives.
+
+    Entries lost from the cache are rebuilt by checking the JPEG fallbacks
+    in ``storage`` once.
+    """
+    key = widths_key(name)
+    widths = cache.get(key)
+    if widths is None:
+        widths = [width for width in WIDTHS if storage.exists(variant_name(name, width, 'jpg'))]
+        cache.set(key, widths, None if widths else PENDING_TIMEOUT)
+    return widths
+
+
+def build_derivatives(name, storage=default_storage, overwrite=False):
+    """Write every variant of the stored image ``name``. Returns files written."""
+    with storage.open(name, 'rb') as handle:
+        original = ImageOps.exif_transpose(Image.open(handle))
+        original.load()
+    if original.mode not in ('RGB', 'L'):
+        original = original.convert('RGB')
+
+    written = 0
+    built = []
+    for width in WIDTHS:
+        # Never upscale; the smallest variant is always produced.
+        if width > original.width and width != WIDTHS[0]:
+            break
+        built.append(width)
+        resized = original.copy()
+        resized.thumbnail((width, width * 4))
+        for ext, (fmt, options) in FORMATS.items():
+            target = variant_name(name, width, ext)
+            if not overwrite and storage.exists(target):
+                continue
+            buffer = BytesIO()
+            resized.save(buffer, format=fmt, **options)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+            written += 1
+    cache.set(widths_key(name), built, None)
+    return written
+
+
+def safe_build(name, on_done=None):
+    try:
+        build_derivatives(name)
+    except Exception:
+        logger.exception("Could not build image derivatives for %s", name)
+    else:
+        if on_done:
+            on_done()
+
+
+def schedule(field_file, on_done=None):
+    """Queue variant generation for ``field_file`` once the upload is committed.
+
+    ``on_done`` runs in the worker thread after the variants are written.
+    """
+    if not field_file:
+        return
+    name = field_file.name
+    if default_storage.exists(variant_name(name, WIDTHS[0], 'jpg')):
+        return
+    transaction.on_commit(lambda: executor.submit(safe_build, name, on_done))
@@ -0,0 +1,234 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import page_cache
+from .models import Event, Registration, UserProfile, WaitlistEntry
+from .ticket_export import pool_context
+
+
+# Bulk import of users, profiles and registrations from CSV or JSONL.
+#
+# Rows are written in chunks with bulk_create, which skips the per-row
+# post_save receivers (profile creation, cache bumps), so this module does
+# their work once per chunk instead. Re-running an import is safe: existing
+# users are left untouched and duplicate profiles or registrations are
+# ignored by their unique constraints. Event capacity is honoured: rows
+# beyond the free seats go on the event's waitlist, in file order.
+#
+# Recognised columns: username (required), email, password, first_name,
+# last_name, full_name, phone, location, event (an event id).
+
+CHUNK_SIZE = 1000
+USER_FIELDS = ('email', 'first_name', 'last_name')
+PROFILE_FIELDS = ('full_name', 'phone', 'location')
+
+
+def read_rows(path, fmt=None):
+    """Yield one dict per input row from a .csv or .jsonl file."""
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        if fmt == 'jsonl':
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(handle)
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def is_hashed(password):
+    try:
+        identify_hasher(password)
+    except ValueError:
+        return False
+    return True
+
+
+def hash_passwords(passwords, pool=None):
+    """Hash raw passwords, keeping ones that are already hashed."""
+    raw = [password for password in passwords if password and not is_hashed(password)]
+    if pool and len(raw) > 1:
+        hashed = dict(zip(raw, pool.map(make_password, raw, chunksize=16)))
+    else:
+        hashed = {password: make_password(password) for password in raw}
+    # No password gives an unusable one, as for createsuperuser --noinput
+    return [hashed.get(password, password) if password else make_password(None) for password in passwords]
+
+
+class Importer:
+    def __init__(self, event=None, workers=None, chunk_size=CHUNK_SIZE):
+        self.default_event = event
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+        self.chunk_size = chunk_size
+        self.event_ids = set(Event.objects.values_list('id', flat=True)) if event is None else {event.pk}
+        self.stats = {
+            'rows': 0, 'users': 0, 'profiles': 0, 'registrations': 0, 'waitlisted': 0, 'skipped': 0,
+        }
+
+    def run(self, rows):
+        started = time.monotonic()
+        touched_events = set()
+        try:
+            for chunk in chunked(rows, self.chunk_size):
+                touched_events |= self.import_chunk(chunk)
+        finally:
+            if self.pool:
+                self.pool.shutdown()
+        recount_seats(touched_events)
+
+        elapsed = time.monotonic() - started
+        self.stats['seconds'] = elapsed
+        self.stats['rows_per_second'] = self.stats['rows'] / elapsed if elapsed else 0.0
+        return self.stats
+
+    def import_chunk(self, chunk):
+        rows = {}
+        for row in chunk:
+            self.stats['rows'] += 1
+            username = (row.get('username') or '').strip()
+            if not username or username in rows:
+                self.stats['skipped'] += 1
+                continue
+            rows[username] = row
+
+        with transaction.atomic():
+            existing = set(User.objects.filter(username__in=rows).values_list('username', flat=True))
+            new = [username for username in rows if username not in existing]
+            passwords = self.hash_passwords([rows[username].get('password') or '' for username in new])
+            User.objects.bulk_create([
+                User(
+                    username=username, password=password,
+                    **{field: rows[username].get(field) or '' for field in USER_FIELDS},
+                )
+                for username, password in zip(new, passwords)
+            ], batch_size=self.chunk_size)
+            self.stats['users'] += len(new)
+
+            ids = dict(User.objects.filter(username__in=rows).values_list('username', 'id'))
+            has_profile = set(UserProfile.objects.filter(user_id__in=ids.values()).values_list('user_id', flat=True))
+            profiles = [
+                UserProfile(user_id=ids[username], **{field: row.get(field) or '' for field in PROFILE_FIELDS})
+                for username, row in rows.items() if ids[username] not in has_profile
+            ]
+            UserProfile.objects.bulk_create(profiles, batch_size=self.chunk_size, ignore_conflicts=True)
+            self.stats['profiles'] += len(profiles)
+
+            pairs = {}
+            for username, row in rows.items():
+                event_id = self.event_for(row)
+                if event_id is not None:
+                    pairs[(event_id, ids[username])] = None
+            self.register(list(pairs))
+
+        # Event pages are bumped once by recount_seats at the end
+        for _, user_id in pairs:
+            page_cache.bump(page_cache.user_scope(user_id))
+        return {event_id for event_id, _ in pairs}
+
+    def hash_passwords(self, passwords):
+        raw = [password for password in passwords if password and not is_hashed(password)]
+        # PBKDF2 dominates the import when rows carry plain-text passwords;
+        # the pool is only started once a chunk actually needs it.
+        if len(raw) > 1 and self.workers > 1 and self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=pool_context())
+        return hash_passwords(passwords, self.pool)
+
+    def event_for(self, row):
+        if self.default_event is not None:
+            return self.default_event.pk
+        try:
+            event_id = int(row.get('event') or 0)
+        except (TypeError, ValueError):
+            return None
+        return event_id if event_id in self.event_ids else None
+
+    def register(self, pairs):
+        """Register (event_id, user_id) pairs up to each event's free seats.
+
+        Runs inside the chunk's transaction; the event rows are locked so
+        concurrent registrations cannot claim the same seats.
+        """
+        if not pairs:
+            return
+        event_ids = {event_id for event_id, _ in pairs}
+        user_ids = {user_id for _, user_id in pairs}
+        registered = set(
+            Registration.objects.filter(event_id__in=event_ids, user_id__in=user_ids)
+            .values_list('event_id', 'user_id')
+        )
+        waiting = set(
+            WaitlistEntry.objects.filter(event_id__in=event_ids, user_id__in=user_ids)
+            .values_list('event_id', 'user_id')
+        )
+        seats = {
+            pk: None if capacity is None else max(capacity - taken, 0)
+            for pk, capacity, taken in Event.objects.select_for_update()
+            .filter(pk__in=event_ids).values_list('pk', 'capacity', 'seats_taken')
+        }
+
+        admitted, overflow = [], []
+        for pair in pairs:
+            event_id = pair[0]
+            if pair in registered:
+                continue
+            if seats[event_id] is None or seats[event_id] > 0:
+                admitted.append(pair)
+                if seats[event_id] is not None:
+                    seats[event_id] -= 1
+            elif pair not in waiting:
+                overflow.append(pair)
+
+        Registration.objects.bulk_create(
+            [Registration(event_id=event_id, user_id=user_id) for event_id, user_id in admitted],
+            batch_size=self.chunk_size,
+        )
+        WaitlistEntry.objects.bulk_create(
+            [WaitlistEntry(event_id=event_id, user_id=user_id) for event_id, user_id in overflow],
+            batch_size=self.chunk_size,
+        )
+        for event_id in event_ids:
+            taken = [user_id for pk, user_id in admitted if pk == event_id]
+            if taken:
+                Event.objects.filter(pk=event_id).touch(seats_taken=F('seats_taken') + len(taken))
+                # Registered attendees no longer wait for a seat
+                WaitlistEntry.objects.filter(event_id=event_id, user_id__in=taken).delete()
+        self.stats['registrations'] += len(admitted)
+        self.stats['waitlisted'] += len(overflow)
+
+
+def seat_counts():
+    """Registration count per event, as an expression for Event.seats_taken."""
+    counts = (
+        Registration.objects.filter(event=OuterRef('pk'))
+        .order_by().values('event').annotate(total=Count('id')).values('total')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def recount_seats(event_ids):
+    """Reconcile seats_taken with the registration rows and bump event pages."""
+    if not event_ids:
+        return
+    Event.objects.filter(pk__in=event_ids).touch(seats_taken=seat_counts())
+    for event_id in event_ids:
+        page_cache.bump(page_cache.event_scope(event_id))
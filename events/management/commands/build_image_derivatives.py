@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from events.images import build_derivatives
+from events.models import Event, UserProfile
+
+
+class Command(BaseCommand):
+    help = "Generate resized WebP/JPEG variants for existing event images and avatars."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--overwrite', action='store_true', help="Re-encode existing variants.")
+
+    def handle(self, *args, **options):
+        names = set(
+            Event.objects.exclude(image='').exclude(image__isnull=True)
+            .values_list('image', flat=True).iterator()
+        )
+        names.update(
+            UserProfile.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+            .values_list('profile_picture', flat=True).iterator()
+        )
+
+        written = failed = 0
+        for name in sorted(names):
+            try:
+                written += build_derivatives(name, overwrite=options['overwrite'])
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"{name}: {exc}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {len(names)} images, wrote {written} variants, {failed} failed."
+        ))
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from events.models import Event
+from events.ticket_export import stream_ticket_zip
+
+
+class Command(BaseCommand):
+    help = "Render tickets for every registrant of an event into a ZIP file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_id', type=int)
+        parser.add_argument('--output', '-o', help="Defaults to event_<id>_tickets.zip")
+        parser.add_argument('--workers', type=int, default=None, help="Rendering processes.")
+        parser.add_argument('--base-url', help="Site root for the QR codes. Defaults to SITE_URL.")
+
+    def handle(self, *args, **options):
+        try:
+            event = Event.objects.get(pk=options['event_id'])
+        except Event.DoesNotExist:
+            raise CommandError(f"Event {options['event_id']} does not exist.")
+
+        base_url = options['base_url'] or getattr(settings, 'SITE_URL', '')
+        if not base_url:
+            raise CommandError("Set SITE_URL or pass --base-url so the QR codes link to the public site.")
+
+        output = options['output'] or f"event_{event.pk}_tickets.zip"
+        stats = {}
+        with open(output, 'wb') as handle:
+            for chunk in stream_ticket_zip(event, base_url, workers=options['workers'], stats=stats):
+                handle.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {stats['tickets']} tickets to {output} in {stats['seconds']:.2f}s "
+            f"({stats['tickets_per_second']:.1f} tickets/s)."
+        ))
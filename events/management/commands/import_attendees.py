@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.importer import CHUNK_SIZE, Importer, read_rows
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = "Create users, profiles and registrations in bulk from a CSV or JSONL file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension.")
+        parser.add_argument('--event', type=int, help="Register every row for this event id.")
+        parser.add_argument('--workers', type=int, default=None, help="Password hashing processes (default: CPU count).")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        event = None
+        if options['event'] is not None:
+            try:
+                event = Event.objects.get(pk=options['event'])
+            except Event.DoesNotExist:
+                raise CommandError(f"Event {options['event']} does not exist.")
+
+        importer = Importer(event=event, workers=options['workers'], chunk_size=options['chunk_size'])
+        try:
+            stats = importer.run(read_rows(options['path'], options['format']))
+        except FileNotFoundError:
+            raise CommandError(f"{options['path']} does not exist.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['rows']} rows in {stats['seconds']:.2f}s ({stats['rows_per_second']:.0f} rows/s): "
+            f"{stats['users']} users, {stats['profiles']} profiles, {stats['registrations']} registrations, "
+            f"{stats['waitlisted']} waitlisted, {stats['skipped']} skipped."
+        ))
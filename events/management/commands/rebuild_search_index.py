@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from events import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for events."
+
+    def handle(self, *args, **options):
+        backend = search.backend()
+        if backend is None:
+            self.stdout.write(self.style.WARNING(
+                "No full-text backend available; search uses icontains."
+            ))
+            return
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} events ({backend})."))
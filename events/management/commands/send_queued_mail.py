@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events import outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep polling the outbox instead of exiting once it is drained.",
+        )
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds between polls.")
+
+    def handle(self, *args, **options):
+        while True:
+            total_sent = total_failed = 0
+            while True:
+                sent, failed = outbox.deliver_batch(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                # Stop once nothing was sendable; failed rows wait for their backoff.
+                if not sent:
+                    break
+            if total_sent or total_failed:
+                self.stdout.write(f"Sent {total_sent}, failed {total_failed}.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,166 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+
+from .models import Event
+
+
+# Uploaded files under MEDIA_URL, served with access control in every
+# environment, not only under DEBUG. Images (and their derivatives) are
+# public; event PDFs are for the organizer, registrants and staff.
+#
+# Once access is checked, the transfer can be handed to the front-end
+# server with MEDIA_ACCEL:
+#   'x-accel-redirect'  nginx; MEDIA_ACCEL_PREFIX must be an internal
+#                       location aliased to MEDIA_ROOT
+#   'x-sendfile'        Apache mod_xsendfile, lighttpd
+# Otherwise the file is streamed from Python with single byte-range, ETag
+# and If-Modified-Since support.
+
+PUBLIC_DIRS = ('event_images', 'profile_pics', 'derivatives')
+ACCEL_HEADERS = {'x-accel-redirect': 'X-Accel-Redirect', 'x-sendfile': 'X-Sendfile'}
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+PUBLIC_CACHE = 'public, max-age=86400'
+PRIVATE_CACHE = 'private, max-age=3600'
+
+
+class UnsatisfiableRange(Exception):
+    pass
+
+
+def is_public(name):
+    return name.split('/', 1)[0] in PUBLIC_DIRS
+
+
+def can_download(user, name):
+    """Whether ``user`` may fetch the protected file ``name``."""
+    if not user.is_authenticated:
+        return False
+    if user.is_staff:
+        return True
+    if name.startswith('event_pdfs/'):
+        return Event.objects.filter(Q(organizer=user) | Q(registered_users=user), pdf=name).exists()
+    return False
+
+
+def parse_range(header, size):
+    """Inclusive (start, end) of a single byte range, or None to send it all.
+
+    Multiple ranges and malformed headers get the whole file, which HTTP
+    allows. Raises UnsatisfiableRange when the range lies past the end.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-N: the last N bytes
+        if int(last) == 0:
+            raise UnsatisfiableRange
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise UnsatisfiableRange
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+class FileRange:
+    """Read-only view of ``length`` bytes of ``handle`` from ``start``."""
+
+    def __init__(self, handle, start, length):
+        handle.seek(start)
+        self.handle = handle
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.handle.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.handle.close()
+
+
+def send_file(request, path, name, cache_control):
+    """Response for the local file ``path``, stored as ``name``."""
+    stat = os.stat(path)
+    etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        accel = getattr(settings, 'MEDIA_ACCEL', '')
+        if accel:
+            if accel not in ACCEL_HEADERS:
+                raise ImproperlyConfigured(f"MEDIA_ACCEL must be one of {', '.join(ACCEL_HEADERS)}.")
+            response = HttpResponse(content_type=content_type)
+            if accel == 'x-accel-redirect':
+                response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + name)
+            else:
+                response['X-Sendfile'] = path
+        else:
+            try:
+                response = ranged_response(request, path, stat.st_size, etag, stat.st_mtime, content_type)
+            except UnsatisfiableRange:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{stat.st_size}'
+            response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def ranged_response(request, path, size, etag, mtime, content_type):
+    byte_range = None
+    if 'Range' in request.headers and request.method == 'GET':
+        # If-Range: only honour the range when the client's copy is current
+        if_range = request.headers.get('If-Range')
+        if not if_range or if_range == http_date(mtime) or etag in parse_etags(if_range):
+            byte_range = parse_range(request.headers['Range'], size)
+    handle = open(path, 'rb')
+    # Same Content-Disposition whether or not a range was asked for
+    filename = os.path.basename(path)
+    if byte_range is None:
+        return FileResponse(handle, content_type=content_type, filename=filename)
+    start, end = byte_range
+    response = FileResponse(
+        FileRange(handle, start, end - start + 1), status=206, content_type=content_type, filename=filename,
+    )
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def serve_media(request, path):
+    name = posixpath.normpath(path)
+    if name != path or name.startswith(('/', '..')):
+        raise Http404
+    public = is_public(name)
+    if not public:
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        # Not found rather than forbidden, so file names are not confirmed
+        if not can_download(request.user, name):
+            raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    return send_file(request, full_path, name, PUBLIC_CACHE if public else PRIVATE_CACHE)
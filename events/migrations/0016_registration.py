@@ -0,0 +1,68 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_registrations(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Registration = apps.get_model('events', 'Registration')
+    Through = Event.registered_users.through
+    db = schema_editor.connection.alias
+    rows = Through.objects.using(db).values_list('event_id', 'user_id').iterator(chunk_size=2000)
+    batch = []
+    for event_id, user_id in rows:
+        batch.append(Registration(event_id=event_id, user_id=user_id))
+        if len(batch) >= 2000:
+            Registration.objects.using(db).bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    Registration.objects.using(db).bulk_create(batch, ignore_conflicts=True)
+
+
+def restore_registrations(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Registration = apps.get_model('events', 'Registration')
+    Through = Event.registered_users.through
+    db = schema_editor.connection.alias
+    Through.objects.using(db).bulk_create(
+        [
+            Through(event_id=event_id, user_id=user_id)
+            for event_id, user_id in Registration.objects.using(db).values_list('event_id', 'user_id')
+        ],
+        batch_size=2000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0015_event_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Registration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('registered_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registrations', to='events.event')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registrations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'registered_at'], name='registration_event_at_idx')],
+                'constraints': [models.UniqueConstraint(fields=('event', 'user'), name='unique_event_registration')],
+            },
+        ),
+        migrations.RunPython(copy_registrations, restore_registrations),
+        migrations.RemoveField(
+            model_name='event',
+            name='registered_users',
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='registered_users',
+            field=models.ManyToManyField(blank=True, related_name='registered_events', through='events.Registration', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
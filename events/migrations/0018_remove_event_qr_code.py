@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0017_outboundemail'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='event',
+            name='qr_code',
+        ),
+    ]
@@ -1,10 +1,15 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import User
-import qrcode
-from io import BytesIO
-from django.core.files import File
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
+
+
+class EventQuerySet(models.QuerySet):
+    def touch(self, **fields):
+        """update() that also marks the events as changed (version, updated_at)."""
+        return self.update(version=F('version') + 1, updated_at=timezone.now(), **fields)
 
 
 class Event(models.Model):
@@ -17,23 +22,83 @@ class Event(models.Model):
     map_link = models.URLField(blank=True, null=True)
     image = models.ImageField(upload_to='event_images/', blank=True, null=True)
     pdf = models.FileField(upload_to='event_pdfs/', blank=True, null=True)
-    qr_code = models.ImageField(upload_to='qr_codes/', blank=True, null=True)
     organizer = models.ForeignKey(User, on_delete=models.CASCADE)
-    registered_users = models.ManyToManyField(User, related_name='registered_events', blank=True)
+    registered_users = models.ManyToManyField(
+        User, through='Registration', related_name='registered_events', blank=True
+    )
+    # Optional seat limit; seats_taken is a denormalized registration count
+    capacity = models.PositiveIntegerField(blank=True, null=True)
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
+    # Validators for conditional GET; bumped on edits and registration changes
+    updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = EventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # home feed: keyset pagination and date filters
+            models.Index(fields=['date', 'id'], name='event_date_id_idx'),
+            # my_events and the admin organizer filter
+            models.Index(fields=['organizer', 'date'], name='event_organizer_date_idx'),
+        ]
 
     def save(self, *args, **kwargs):
+        editing = not self._state.adding
+        if editing:
+            # Counted in SQL so concurrent seat updates never reuse a version
+            self.version = F('version') + 1
+            if kwargs.get('update_fields') is None:
+                # seats_taken is only changed by the conditional seat UPDATEs;
+                # writing back a stale in-memory count would undo them.
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name != 'seats_taken'
+                ]
+            else:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version', 'updated_at'}
         super().save(*args, **kwargs)
-        qr = qrcode.make(f"http://127.0.0.1:8000/event/{self.id}/")
-        canvas = BytesIO()
-        qr.save(canvas, format='PNG')
-        fname = f'qr_code_{self.id}.png'
-        self.qr_code.save(fname, File(canvas), save=False)
-        super().save(*args, **kwargs)
+        if editing:
+            self.refresh_from_db(fields=['version', 'seats_taken'])
+
+    def is_registered(self, user):
+        if not user.is_authenticated:
+            return False
+        return Registration.objects.filter(event=self, user=user).exists()
+
+    @property
+    def seats_left(self):
+        if self.capacity is None:
+            return None
+        return max(self.capacity - self.seats_taken, 0)
+
+    def is_waitlisted(self, user):
+        if not user.is_authenticated:
+            return False
+        return WaitlistEntry.objects.filter(event=self, user=user).exists()
 
     def __str__(self):
         return self.title
 
 
+class Registration(models.Model):
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='registrations')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='registrations')
+    registered_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'user'], name='unique_event_registration'),
+        ]
+        indexes = [
+            # registrant lists for organizers, oldest first
+            models.Index(fields=['event', 'registered_at'], name='registration_event_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} -> {self.event}"
+
+
 #  Enhanced UserProfile model
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -58,3 +123,48 @@ class UserProfile(models.Model):
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
+
+
+# Users queued for a full event, promoted in joined_at order as seats free up
+class WaitlistEntry(models.Model):
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='waitlist')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries')
+    joined_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'user'], name='unique_event_waitlist'),
+        ]
+        indexes = [
+            models.Index(fields=['event', 'joined_at'], name='waitlist_event_joined_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} waiting for {self.event}"
+
+
+# Outgoing mail queue, drained by the send_queued_mail command
+class OutboundEmail(models.Model):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed')]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} ({self.status})"
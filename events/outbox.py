@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+# Persistent email outbox. Requests only insert a row; the send_queued_mail
+# worker delivers due messages in batches over one reused SMTP connection.
+#
+# Several workers may run at once. A worker claims its batch before sending
+# by pushing the rows' next_attempt_at past a lease, inside a transaction
+# that skips rows another worker has locked (PostgreSQL) or holds the write
+# lock from BEGIN (SQLite in IMMEDIATE mode). Rows of a worker that dies
+# mid-batch become due again once the lease runs out.
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF_SECONDS = 60
+DEFAULT_LEASE_SECONDS = 300
+
+
+def enqueue(subject, body, recipients, from_email=None):
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipients),
+    )
+
+
+def backoff(attempts):
+    base = getattr(settings, 'EMAIL_OUTBOX_BACKOFF_SECONDS', DEFAULT_BACKOFF_SECONDS)
+    # 1x, 2x, 4x ... capped at one day
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 86400))
+
+
+def due_messages(batch_size):
+    return OutboundEmail.objects.filter(
+        status=OutboundEmail.PENDING, next_attempt_at__lte=timezone.now()
+    ).order_by('next_attempt_at', 'id')[:batch_size]
+
+
+def claim_due(batch_size):
+    """Lease up to ``batch_size`` due messages to this worker and return them."""
+    lease = timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+    with transaction.atomic():
+        messages = list(due_messages(batch_size).select_for_update(skip_locked=True))
+        if messages:
+            OutboundEmail.objects.filter(pk__in=[message.pk for message in messages]).update(
+                next_attempt_at=timezone.now() + lease
+            )
+    return messages
+
+
+def mark_failure(message, error, max_attempts):
+    message.attempts += 1
+    message.last_error = str(error)[:2000]
+    if message.attempts >= max_attempts:
+        message.status = OutboundEmail.FAILED
+    else:
+        message.next_attempt_at = timezone.now() + backoff(message.attempts)
+
+
+def deliver_batch(batch_size=None, connection=None):
+    """Send one batch of due messages. Returns (sent, failed) counts.
+
+    Only messages claimed by this call are sent, one by one over a single
+    open connection so a bad recipient only fails its own row. If the
+    connection itself cannot be opened the whole batch is rescheduled.
+    """
+    batch_size = batch_size or getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+    messages = claim_due(batch_size)
+    if not messages:
+        return 0, 0
+
+    sent = failed = 0
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        for message in messages:
+            mark_failure(message, exc, max_attempts)
+        failed = len(messages)
+    else:
+        try:
+            for message in messages:
+                email = EmailMessage(
+                    message.subject,
+                    message.body,
+                    message.from_email,
+                    message.recipients,
+                    connection=connection,
+                )
+                try:
+                    email.send()
+                except Exception as exc:
+                    mark_failure(message, exc, max_attempts)
+                    failed += 1
+                else:
+                    message.status = OutboundEmail.SENT
+                    message.attempts += 1
+                    message.sent_at = timezone.now()
+                    message.last_error = ''
+                    sent += 1
+        finally:
+            connection.close()
+
+    OutboundEmail.objects.bulk_update(
+        messages, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+    )
+    return sent, failed
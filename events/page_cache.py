@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+
+
+# Versioned page/data cache. Entries are never invalidated by deleting keys:
+# Event and registration signals bump a version number that is part of every
+# key, so stale entries simply stop being read and age out of the backend.
+
+FEED = 'feed'
+DEFAULT_TIMEOUT = 60 * 60
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 5.0
+LOCK_POLL = 0.05
+
+
+def timeout():
+    return getattr(settings, 'PAGE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def version_key(scope):
+    return f'pc:v:{scope}'
+
+
+def event_scope(event_id):
+    return f'event:{event_id}'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def get_version(scope):
+    key = version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so an evicted counter never reuses old keys.
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump(scope):
+    key = version_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def bump_on_commit(*scopes):
+    """bump() ``scopes`` once the current transaction commits.
+
+    Bumping earlier would let a concurrent miss cache the old rows under the
+    new version, where they stay until the next bump or the timeout.
+    """
+    def run():
+        for scope in scopes:
+            bump(scope)
+    transaction.on_commit(run)
+
+
+def attach_versions(events):
+    """Set ``cache_version`` on each event with one get_many round trip."""
+    keys = {event.pk: version_key(event_scope(event.pk)) for event in events}
+    found = cache.get_many(list(keys.values()))
+    for event in events:
+        version = found.get(keys[event.pk])
+        event.cache_version = version if version is not None else get_version(event_scope(event.pk))
+    return events
+
+
+def make_key(name, scopes, *parts):
+    versions = '.'.join(str(get_version(scope)) for scope in scopes)
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'pc:{name}:{versions}:{digest}'
+
+
+def get_or_build(key, builder, ttl=None):
+    """Return the cached value for ``key``, building it at most once.
+
+    Concurrent misses wait for the worker holding the lock instead of all
+    rebuilding the same entry. If the builder takes longer than LOCK_WAIT the
+    waiter builds it itself rather than failing the request.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock = f'{key}:lock'
+    if cache.add(lock, 1, LOCK_TIMEOUT):
+        try:
+            value = builder()
+            cache.set(key, value, ttl or timeout())
+            return value
+        finally:
+            cache.delete(lock)
+
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return builder()
+
+
+def is_cacheable(request, user=None):
+    # Pages for logged-in users or with pending flash messages are per-user.
+    user = user or request.user
+    return (
+        request.method == 'GET'
+        and not user.is_authenticated
+        and 'messages' not in request.COOKIES
+    )
+
+
+def cached_response(key, render):
+    """Serve the body of ``render()`` from the cache under ``key``."""
+    def build():
+        response = render()
+        return (response.content, response['Content-Type'])
+
+    body, content_type = get_or_build(key, build)
+    return HttpResponse(body, content_type=content_type)
+
+
+def feed_key(request):
+    return make_key('home', [FEED], request.GET.urlencode(), timezone.localdate())
+
+
+def event_page_key(event_id):
+    return make_key('event', [event_scope(event_id)], event_id)
+
+
+def event_object_key(event_id):
+    return make_key('event-obj', [event_scope(event_id)], event_id)
+
+
+# Async twins of the helpers above for the ASGI views, so a miss never
+# blocks the event loop.
+
+async def aget_version(scope):
+    key = version_key(scope)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, int(time.time() * 1000), None)
+        version = await cache.aget(key)
+    return version
+
+
+async def amake_key(name, scopes, *parts):
+    versions = '.'.join([str(await aget_version(scope)) for scope in scopes])
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'pc:{name}:{versions}:{digest}'
+
+
+async def aget_or_build(key, builder, ttl=None):
+    """Async get_or_build; ``builder`` is a coroutine function."""
+    value = await cache.aget(key)
+    if value is not None:
+        return value
+
+    lock = f'{key}:lock'
+    if await cache.aadd(lock, 1, LOCK_TIMEOUT):
+        try:
+            value = await builder()
+            await cache.aset(key, value, ttl or timeout())
+            return value
+        finally:
+            await cache.adelete(lock)
+
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL)
+        value = await cache.aget(key)
+        if value is not None:
+            return value
+    return await builder()
+
+
+def lookup(make_key):
+    key = make_key()
+    return key, cache.get(key)
+
+
+async def acached_response(make_key, render):
+    """Async cached_response; ``make_key`` is one of the sync key functions.
+
+    Building the key and reading the entry share one thread hop, so a hit
+    costs no more than under the sync view.
+    """
+    key, value = await sync_to_async(lookup)(make_key)
+    if value is None:
+        async def build():
+            response = await render()
+            return (response.content, response['Content-Type'])
+
+        value = await aget_or_build(key, build)
+    body, content_type = value
+    return HttpResponse(body, content_type=content_type)
+
+
+async def aattach_versions(events):
+    keys = {event.pk: version_key(event_scope(event.pk)) for event in events}
+    found = await cache.aget_many(list(keys.values()))
+    for event in events:
+        version = found.get(keys[event.pk])
+        event.cache_version = version if version is not None else await aget_version(event_scope(event.pk))
+    return events
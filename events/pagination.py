@@ -0,0 +1,155 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+# Keyset (cursor) pagination over a unique ordering such as ('-date', '-id'),
+# the home feed's newest first. Every page is a single indexed range scan,
+# so page N costs the same as page 1.
+
+DEFAULT_PAGE_SIZE = 12
+MAX_PAGE_SIZE = 100
+EVENT_ORDERING = ('-date', '-id')
+
+
+def get_page_size(request, max_size=None):
+    default = getattr(settings, 'EVENTS_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    max_size = max_size or getattr(settings, 'EVENTS_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+    try:
+        size = int(request.GET.get('per_page', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, max_size))
+
+
+def encode_cursor(obj, ordering=EVENT_ORDERING):
+    values = (getattr(obj, field.lstrip('-')) for field in ordering)
+    return '.'.join(value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in values)
+
+
+def decode_cursor(value, model, ordering=EVENT_ORDERING):
+    """Field values of a cursor, or None if it is malformed.
+
+    Only the first field's value may contain a dot, e.g. a datetime.
+    """
+    try:
+        parts = value.rsplit('.', len(ordering) - 1)
+        if len(parts) != len(ordering):
+            return None
+        return tuple(
+            model._meta.get_field(field.lstrip('-')).to_python(part) for field, part in zip(ordering, parts)
+        )
+    except (AttributeError, ValueError, ValidationError):
+        return None
+
+
+def reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else '-' + field for field in ordering)
+
+
+def seek(ordering, values):
+    """Q for the rows that come after ``values`` in ``ordering``."""
+    field, *rest = ordering
+    name, lookup = field.lstrip('-'), 'lt' if field.startswith('-') else 'gt'
+    condition = Q(**{f'{name}__{lookup}': values[0]})
+    if rest:
+        # The redundant bound gives an index on the leading field a range to seek to
+        condition = Q(**{f'{name}__{lookup}e': values[0]}) & (condition | seek(rest, values[1:]))
+    return condition
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def keyset_query(queryset, ordering, after=None, before=None, page_size=DEFAULT_PAGE_SIZE):
+    """The single query behind a page: (queryset, walking_backwards)."""
+    if before:
+        backwards = reverse_ordering(ordering)
+        return queryset.filter(seek(backwards, before)).order_by(*backwards)[:page_size + 1], True
+    if after:
+        queryset = queryset.filter(seek(ordering, after))
+    return queryset.order_by(*ordering)[:page_size + 1], False
+
+
+def build_page(rows, backwards, after, page_size, ordering):
+    has_more = len(rows) > page_size
+    if backwards:
+        items = rows[:page_size][::-1]
+        return KeysetPage(
+            items,
+            next_cursor=encode_cursor(items[-1], ordering),
+            prev_cursor=encode_cursor(items[0], ordering) if has_more else None,
+        )
+    items = rows[:page_size]
+    return KeysetPage(
+        items,
+        next_cursor=encode_cursor(items[-1], ordering) if has_more else None,
+        prev_cursor=encode_cursor(items[0], ordering) if after and items else None,
+    )
+
+
+def paginate(queryset, ordering, after=None, before=None, page_size=DEFAULT_PAGE_SIZE):
+    """Return one KeysetPage of ``queryset`` in ``ordering``.
+
+    ``ordering`` is a tuple of order_by() fields ending in a unique one,
+    e.g. ('-date', '-id'). ``after`` continues past a cursor (next page),
+    ``before`` walks back from one (previous page). Malformed cursors fall
+    back to the first page.
+    """
+    after = decode_cursor(after, queryset.model, ordering) if after else None
+    before = decode_cursor(before, queryset.model, ordering) if before else None
+    query, backwards = keyset_query(queryset, ordering, after, before, page_size)
+    rows = list(query)
+    if backwards and not rows:
+        return paginate(queryset, ordering, page_size=page_size)
+    return build_page(rows, backwards, after, page_size, ordering)
+
+
+async def apaginate(queryset, ordering, after=None, before=None, page_size=DEFAULT_PAGE_SIZE):
+    """Async paginate() for the ASGI views."""
+    after = decode_cursor(after, queryset.model, ordering) if after else None
+    before = decode_cursor(before, queryset.model, ordering) if before else None
+    query, backwards = keyset_query(queryset, ordering, after, before, page_size)
+    rows = [obj async for obj in query]
+    if backwards and not rows:
+        return await apaginate(queryset, ordering, page_size=page_size)
+    return build_page(rows, backwards, after, page_size, ordering)
+
+
+def paginate_events(queryset, after=None, before=None, page_size=DEFAULT_PAGE_SIZE):
+    """One KeysetPage of events, newest first."""
+    return paginate(queryset, EVENT_ORDERING, after=after, before=before, page_size=page_size)
+
+
+async def apaginate_events(queryset, after=None, before=None, page_size=DEFAULT_PAGE_SIZE):
+    """Async paginate_events for the ASGI views."""
+    return await apaginate(queryset, EVENT_ORDERING, after=after, before=before, page_size=page_size)
+
+
+def page_url(request, **params):
+    """Current query string with the pagination params replaced."""
+    query = request.GET.copy()
+    for key in ('after', 'before'):
+        query.pop(key, None)
+    for key, value in params.items():
+        if value is not None:
+            query[key] = value
+    return f"?{query.urlencode()}"
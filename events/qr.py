@@ -0,0 +1,47 @@
+import hashlib
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+
+
+# QR codes are generated on demand from the event URL and cached, instead of
+# being written to MEDIA_ROOT on every Event.save(). The image depends only on
+# the encoded URL and format, so the ETag is known without rendering anything.
+# The URL is built on SITE_URL when it is set, else on the request's host;
+# code without a request must be given a base explicitly.
+
+FORMATS = {
+    'svg': 'image/svg+xml',
+    'png': 'image/png',
+}
+CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+
+def base_url(request):
+    return (getattr(settings, 'SITE_URL', '') or request.build_absolute_uri('/')).rstrip('/')
+
+
+def event_url(event_id, base_url):
+    return base_url.rstrip('/') + reverse('event_detail', args=[event_id])
+
+
+def qr_etag(url, fmt):
+    return '"' + hashlib.sha1(f'{fmt}|{url}'.encode()).hexdigest() + '"'
+
+
+def encode(url, fmt):
+    buffer = BytesIO()
+    if fmt == 'svg':
+        qrcode.make(url, image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    else:
+        qrcode.make(url).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def render_qr(url, fmt):
+    key = 'qr:' + qr_etag(url, fmt).strip('"')
+    return cache.get_or_set(key, lambda: encode(url, fmt), CACHE_TIMEOUT)
@@ -0,0 +1,114 @@
+import random
+import time
+from functools import wraps
+
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F, Q
+
+from . import outbox
+from .models import Event, Registration, WaitlistEntry
+
+
+# Seat allocation. A seat is claimed with one conditional UPDATE on the event
+# row (seats_taken < capacity), so concurrent requests can never oversell and
+# no request has to load the registrant list.
+
+REGISTERED = 'registered'
+ALREADY_REGISTERED = 'already_registered'
+WAITLISTED = 'waitlisted'
+ALREADY_WAITLISTED = 'already_waitlisted'
+
+
+# A burst of writers can outlast SQLite's busy_timeout; the whole
+# registration is then retried with jittered exponential backoff.
+LOCK_RETRIES = 5
+LOCK_BACKOFF = 0.05
+
+
+class EventFull(Exception):
+    pass
+
+
+def retry_when_locked(func):
+    @wraps(func)
+    def inner(*args, **kwargs):
+        for attempt in range(LOCK_RETRIES):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as exc:
+                # Inside a caller's transaction the work cannot be redone here
+                if 'locked' not in str(exc) or connection.in_atomic_block or attempt == LOCK_RETRIES - 1:
+                    raise
+                time.sleep(LOCK_BACKOFF * 2 ** attempt * (1 + random.random()))
+    return inner
+
+
+def claim_seat(event_id):
+    return Event.objects.filter(pk=event_id).filter(
+        Q(capacity__isnull=True) | Q(seats_taken__lt=F('capacity'))
+    ).touch(seats_taken=F('seats_taken') + 1)
+
+
+@retry_when_locked
+def register_user(event, user):
+    """Register ``user`` for ``event`` or put them on its waitlist.
+
+    Returns one of REGISTERED, ALREADY_REGISTERED, WAITLISTED or
+    ALREADY_WAITLISTED.
+    """
+    try:
+        with transaction.atomic():
+            # The unique (event, user) constraint rejects duplicates before a
+            # seat is taken; a full event rolls the registration back.
+            Registration.objects.create(event=event, user=user)
+            if not claim_seat(event.pk):
+                raise EventFull
+            WaitlistEntry.objects.filter(event=event, user=user).delete()
+    except IntegrityError:
+        return ALREADY_REGISTERED
+    except EventFull:
+        try:
+            with transaction.atomic():
+                WaitlistEntry.objects.create(event=event, user=user)
+                # The waitlisted user's view of the event page changed
+                Event.objects.filter(pk=event.pk).touch()
+        except IntegrityError:
+            return ALREADY_WAITLISTED
+        return WAITLISTED
+    return REGISTERED
+
+
+@retry_when_locked
+@transaction.atomic
+def register_and_notify(event, user):
+    """register_user(), queueing the confirmation email in the same transaction."""
+    result = register_user(event, user)
+    if result == REGISTERED and user.email:
+        outbox.enqueue(
+            f"Registration Confirmation: {event.title}",
+            f"Hi {user.username},\n\n"
+            f"You have successfully registered for the event: {event.title}.\n\n"
+            f"📅 Date: {event.date}\n"
+            f"⏰ Time: {event.time}\n"
+            f"📍 Address: {event.address}\n\n"
+            f"Thank you for registering!\n"
+            f"- EventFlow Team",
+            [user.email],
+        )
+    return result
+
+
+def release_seat(event_id):
+    """Give a freed seat back and promote the longest-waiting user, if any."""
+    Event.objects.filter(pk=event_id, seats_taken__gt=0).touch(seats_taken=F('seats_taken') - 1)
+    entries = WaitlistEntry.objects.filter(event_id=event_id).select_related('event', 'user')
+    while (entry := entries.order_by('joined_at', 'id').first()) is not None:
+        result = register_user(entry.event, entry.user)
+        if result == REGISTERED:
+            return entry.user
+        if result != ALREADY_REGISTERED:
+            # Someone else took the seat first
+            return None
+        # Registered some other way; the entry can never be promoted
+        entry.delete()
+    return None
@@ -0,0 +1,134 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+
+# Full-text search over Event title/location/address/description.
+# SQLite uses an FTS5 table keyed by event id, PostgreSQL a GIN-indexed
+# tsvector expression. Other backends fall back to icontains.
+
+FTS_TABLE = 'events_event_fts'
+SEARCH_FIELDS = ('title', 'location', 'address', 'description')
+PG_TSQUERY = "websearch_to_tsquery('english', %s)"
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def backend():
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite' and fts_table_exists():
+        return 'sqlite'
+    return None
+
+
+# Only positive lookups are remembered, so a table created by a later
+# migration is still picked up.
+fts_databases = set()
+
+
+def fts_table_exists():
+    name = str(connection.settings_dict['NAME'])
+    if name in fts_databases:
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+        )
+        found = cursor.fetchone() is not None
+    if found:
+        fts_databases.add(name)
+    return found
+
+
+def pg_vector(table):
+    # Must stay equivalent to the expression indexed in migration 0014,
+    # otherwise PostgreSQL will not use the GIN index. Columns are qualified
+    # so joins added by select_related() cannot make them ambiguous.
+    columns = " || ' ' || ".join(f"coalesce({table}.{field}, '')" for field in SEARCH_FIELDS)
+    return f"to_tsvector('english', {columns})"
+
+
+def fts_query(query):
+    # Quote each token so user input can never be parsed as FTS5 syntax,
+    # and prefix-match the terms to stay close to the old icontains behaviour.
+    tokens = TOKEN_RE.findall(query)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_events(queryset, query, ranked=False):
+    """Filter ``queryset`` to events matching ``query``.
+
+    With ``ranked=True`` the result is ordered best match first.
+    """
+    kind = backend()
+
+    if kind == 'sqlite':
+        match = fts_query(query)
+        if not match:
+            return queryset.none()
+        queryset = queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        )
+        if ranked:
+            # bm25 ordering and any LIMIT happen in SQL, whatever the number
+            # of matches.
+            table = queryset.model._meta.db_table
+            queryset = queryset.annotate(search_rank=RawSQL(
+                f'SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id',
+                [match], output_field=FloatField(),
+            )).order_by('search_rank')
+        return queryset
+
+    if kind == 'postgresql':
+        vector = pg_vector(queryset.model._meta.db_table)
+        queryset = queryset.filter(RawSQL(f'{vector} @@ {PG_TSQUERY}', [query], output_field=BooleanField()))
+        if ranked:
+            queryset = queryset.annotate(
+                search_rank=RawSQL(f'ts_rank({vector}, {PG_TSQUERY})', [query], output_field=FloatField())
+            ).order_by('-search_rank')
+        return queryset
+
+    lookup = Q()
+    for field in SEARCH_FIELDS:
+        lookup |= Q(**{f'{field}__icontains': query})
+    return queryset.filter(lookup)
+
+
+def index_event(event):
+    if backend() != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [event.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, location, address, description) '
+            'VALUES (%s, %s, %s, %s, %s)',
+            [event.pk] + [getattr(event, field) or '' for field in SEARCH_FIELDS],
+        )
+
+
+def unindex_event(event_id):
+    if backend() != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [event_id])
+
+
+def rebuild_index():
+    """Repopulate the search index from the Event table. Returns rows indexed."""
+    from .models import Event
+
+    kind = backend()
+    if kind != 'sqlite':
+        # PostgreSQL indexes the expression itself; nothing to rebuild.
+        return Event.objects.count() if kind else 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, location, address, description) '
+            "SELECT id, coalesce(title, ''), coalesce(location, ''), "
+            "coalesce(address, ''), coalesce(description, '') FROM events_event"
+        )
+        return cursor.rowcount
@@ -0,0 +1,114 @@
+from django.db.models import F, Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import images, page_cache, registrations, search, tickets
+from .models import Event, Registration, UserProfile, WaitlistEntry
+
+
+# Keep the full-text search index in sync with Event rows
+@receiver(post_save, sender=Event)
+def index_event(sender, instance, **kwargs):
+    search.index_event(instance)
+
+
+@receiver(post_delete, sender=Event)
+def unindex_event(sender, instance, **kwargs):
+    search.unindex_event(instance.pk)
+
+
+# Drop cached tickets once the printed event details change
+@receiver(post_save, sender=Event)
+def purge_stale_tickets(sender, instance, created, **kwargs):
+    if not created:
+        tickets.purge_stale(instance)
+
+
+@receiver(post_delete, sender=Event)
+def purge_event_tickets(sender, instance, **kwargs):
+    tickets.purge_event(instance.pk)
+
+
+# Build resized image variants in the background after an upload
+@receiver(post_save, sender=Event)
+def build_event_image_variants(sender, instance, **kwargs):
+    # Cached cards and pages still point at the original until the bump
+    images.schedule(instance.image, on_done=lambda: bump_event(instance.pk))
+
+
+@receiver(post_save, sender=UserProfile)
+def build_avatar_variants(sender, instance, **kwargs):
+    images.schedule(instance.profile_picture)
+
+
+# Bump cache versions so cached feeds and event pages are rebuilt
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_event_pages(sender, instance, **kwargs):
+    bump_event(instance.pk)
+
+
+def bump_event(event_id):
+    page_cache.bump_on_commit(page_cache.FEED, page_cache.event_scope(event_id))
+
+
+@receiver(post_save, sender=Registration)
+@receiver(post_delete, sender=Registration)
+def invalidate_registration_pages(sender, instance, **kwargs):
+    page_cache.bump_on_commit(page_cache.event_scope(instance.event_id), page_cache.user_scope(instance.user_id))
+
+
+@receiver(m2m_changed, sender=Event.registered_users.through)
+def invalidate_registered_users(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        event_ids = [instance.pk] if action.startswith('post_') else []
+    elif action == 'pre_clear':
+        # user.registered_events.clear(): look the events up before the rows go
+        event_ids = list(Registration.objects.filter(user=instance).values_list('event_id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        event_ids = pk_set or []
+    else:
+        event_ids = []
+    page_cache.bump_on_commit(*(page_cache.event_scope(event_id) for event_id in event_ids))
+
+    if reverse:
+        user_ids = [instance.pk] if action.startswith('post_') else []
+    elif action == 'pre_clear':
+        user_ids = list(Registration.objects.filter(event=instance).values_list('user_id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        user_ids = pk_set or []
+    else:
+        user_ids = []
+    page_cache.bump_on_commit(*(page_cache.user_scope(user_id) for user_id in user_ids))
+
+
+# Keep Event.seats_taken in step with registrations made outside register_user
+@receiver(post_delete, sender=Registration)
+def free_seat(sender, instance, origin=None, **kwargs):
+    # Nothing to free when the event itself is being deleted
+    if isinstance(origin, Event) or getattr(origin, 'model', None) is Event:
+        return
+    registrations.release_seat(instance.event_id)
+
+
+@receiver(m2m_changed, sender=Event.registered_users.through)
+def count_added_seats(sender, instance, action, reverse, pk_set, **kwargs):
+    # registered_users.add() bulk-inserts rows without post_save; removals
+    # delete Registration rows and are handled by free_seat. The seats are
+    # claimed with a conditional UPDATE like claim_seat; raising rolls the
+    # add() back, since Django runs it and its signals in one transaction.
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        events = Event.objects.filter(pk__in=pk_set)
+        seats = 1
+        WaitlistEntry.objects.filter(user=instance, event_id__in=pk_set).delete()
+    else:
+        events = Event.objects.filter(pk=instance.pk)
+        seats = len(pk_set)
+        WaitlistEntry.objects.filter(event=instance, user_id__in=pk_set).delete()
+    claimed = events.filter(Q(capacity__isnull=True) | Q(capacity__gte=F('seats_taken') + seats)).touch(
+        seats_taken=F('seats_taken') + seats
+    )
+    if claimed < (len(pk_set) if reverse else 1):
+        raise registrations.EventFull("Not enough seats left; use register_user() to waitlist.")
@@ -0,0 +1,29 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from events.images import available_widths, variant_name
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(field_file, sizes='100vw', **attrs):
+    """<picture> with WebP and JPEG srcsets, or a plain <img> until variants exist."""
+    if not field_file:
+        return ''
+    storage = field_file.storage
+    attrs_html = format_html_join('', ' {}="{}"', attrs.items())
+    widths = available_widths(field_file.name, storage)
+    if not widths:
+        return format_html('<img src="{}"{}>', field_file.url, attrs_html)
+
+    def srcset(ext):
+        return ', '.join(f'{storage.url(variant_name(field_file.name, w, ext))} {w}w' for w in widths)
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" loading="lazy"{}></picture>',
+        srcset('webp'), sizes,
+        storage.url(variant_name(field_file.name, widths[-1], 'jpg')), srcset('jpg'), sizes,
+        attrs_html,
+    )
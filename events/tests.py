@@ -1,3 +1,1427 @@
-from django.test import TestCase
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time as time_module
+import unittest
+import zipfile
+from datetime import date, time, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from eventflow import db_router, instrumentation, profiling, staticfiles
+
+from . import ical, images, media, outbox, page_cache, qr, registrations, tickets
+from .models import Event, OutboundEmail, Registration, UserProfile, WaitlistEntry
+from .pagination import paginate_events
+from .search import rebuild_index, search_events
+
+
+def make_event(organizer, day, **kwargs):
+    fields = {
+        'title': f'Event {day}',
+        'description': 'Description',
+        'date': day,
+        'time': time(18, 0),
+        'location': 'Pune',
+        'address': 'Main Hall',
+        'organizer': organizer,
+    }
+    fields.update(kwargs)
+    return Event.objects.create(**fields)
+
+
+class MediaTestCase(TestCase):
+    """Keeps uploads and generated files in a per-class temporary MEDIA_ROOT."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+
+class KeysetPaginationTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        start = date(2025, 1, 1)
+        # Two events per day so ties on date are broken by id.
+        for offset in range(10):
+            make_event(cls.organizer, start + timedelta(days=offset // 2))
+
+    def test_pages_walk_forward_and_back(self):
+        queryset = Event.objects.all()
+        expected = list(queryset.order_by('-date', '-id'))
+
+        first = paginate_events(queryset, page_size=4)
+        second = paginate_events(queryset, after=first.next_cursor, page_size=4)
+        third = paginate_events(queryset, after=second.next_cursor, page_size=4)
+        self.assertEqual(first.items + second.items + third.items, expected)
+        self.assertFalse(first.has_previous)
+        self.assertFalse(third.has_next)
+
+        back = paginate_events(queryset, before=third.prev_cursor, page_size=4)
+        self.assertEqual(back.items, second.items)
+        back = paginate_events(queryset, before=back.prev_cursor, page_size=4)
+        self.assertEqual(back.items, first.items)
+        self.assertFalse(back.has_previous)
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        page = paginate_events(Event.objects.all(), after='garbage', page_size=3)
+        self.assertEqual(page.items, list(Event.objects.order_by('-date', '-id')[:3]))
+
+    def test_home_links_keep_filters(self):
+        response = self.client.get(reverse('home'), {'q': 'Event', 'per_page': 4})
+        self.assertEqual(len(response.context['page']), 4)
+        self.assertIn('q=Event', response.context['next_url'])
+        self.assertIn('after=', response.context['next_url'])
+        self.assertIsNone(response.context['prev_url'])
+
+
+class SearchTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.concert = make_event(
+            cls.organizer, date(2025, 3, 1), title='Jazz Night', address='Blue Note Club',
+            description='Live jazz and blues',
+        )
+        cls.meetup = make_event(
+            cls.organizer, date(2025, 3, 2), title='Python Meetup', location='Mumbai',
+            description='Talks about jazz-fast Python',
+        )
+
+    def test_matches_every_indexed_column(self):
+        self.assertEqual(list(search_events(Event.objects.all(), 'blue note')), [self.concert])
+        self.assertEqual(list(search_events(Event.objects.all(), 'mumb')), [self.meetup])
+
+    def test_ranked_results_prefer_title_hits(self):
+        ranked = list(search_events(Event.objects.all(), 'jazz', ranked=True))
+        self.assertEqual(ranked, [self.concert, self.meetup])
+
+    def test_ranked_ordering_and_limit_run_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            first = list(search_events(Event.objects.all(), 'jazz', ranked=True)[:1])
+        self.assertEqual(first, [self.concert])
+        self.assertEqual(len(queries), 1)
+        self.assertIn('LIMIT 1', queries[0]['sql'])
+
+    def test_ranked_search_composes_with_only_and_select_related(self):
+        queryset = Event.objects.select_related('organizer').only('id', 'title', 'organizer__username')
+        with self.assertNumQueries(1):
+            ranked = [(event.title, event.organizer.username) for event in search_events(queryset, 'jazz', ranked=True)]
+        self.assertEqual(ranked, [('Jazz Night', 'organizer'), ('Python Meetup', 'organizer')])
+
+    def test_index_follows_save_and_delete(self):
+        self.concert.title = 'Rock Gig'
+        self.concert.save()
+        self.assertFalse(search_events(Event.objects.all(), 'night').exists())
+        self.assertTrue(search_events(Event.objects.all(), 'rock').exists())
+        self.meetup.delete()
+        self.assertFalse(search_events(Event.objects.all(), 'python').exists())
+
+    def test_fts_syntax_in_query_is_harmless(self):
+        self.assertFalse(search_events(Event.objects.all(), 'title: "OR (').exists())
+
+    def test_rebuild_index(self):
+        self.assertEqual(rebuild_index(), 2)
+        self.assertTrue(search_events(Event.objects.all(), 'meetup').exists())
+
+
+FULL_SCAN_RE = re.compile(r'\bSCAN (\w+)$')
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'query plans are SQLite specific')
+class QueryPlanTests(MediaTestCase):
+    """Fail if a hot view's queries fall back to a full table scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.attendee = User.objects.create_user('attendee', password='pass')
+        for offset in range(30):
+            event = make_event(cls.organizer, date(2025, 1, 1) + timedelta(days=offset))
+            event.registered_users.add(cls.attendee)
+
+    def full_scans(self, url, user=None, **params):
+        # Logged in, so the anonymous page cache cannot hide the queries
+        self.client.force_login(user or self.attendee)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        scans = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                for row in cursor.fetchall():
+                    match = FULL_SCAN_RE.search(row[-1])
+                    if match:
+                        scans.append((match.group(1), query['sql']))
+        return scans
+
+    def test_home(self):
+        first = self.client.get(reverse('home'), {'per_page': 5}).context['page']
+        self.assertEqual(self.full_scans(reverse('home')), [])
+        self.assertEqual(self.full_scans(reverse('home'), date='upcoming'), [])
+        self.assertEqual(self.full_scans(reverse('home'), after=first.next_cursor), [])
+        self.assertEqual(self.full_scans(reverse('home'), before=first.next_cursor), [])
+
+    def test_my_events(self):
+        self.assertEqual(self.full_scans(reverse('my_events'), user=self.organizer), [])
+
+    def test_my_registrations(self):
+        self.assertEqual(self.full_scans(reverse('my_registrations'), user=self.attendee), [])
+
+
+class RegistrationTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.attendee = User.objects.create_user('attendee', password='pass')
+        cls.event = make_event(cls.organizer, date(2025, 5, 1))
+        for index in range(20):
+            cls.event.registered_users.add(User.objects.create_user(f'user{index}'))
+
+    def test_membership_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            self.assertFalse(self.event.is_registered(self.attendee))
+        self.event.registered_users.add(self.attendee)
+        with self.assertNumQueries(1):
+            self.assertTrue(self.event.is_registered(self.attendee))
+
+    def test_register_twice_keeps_one_row(self):
+        self.client.force_login(self.attendee)
+        url = reverse('register_for_event', args=[self.event.id])
+        self.client.get(url)
+        self.client.get(url)
+        registrations = Registration.objects.filter(event=self.event, user=self.attendee)
+        self.assertEqual(registrations.count(), 1)
+        self.assertIsNotNone(registrations.get().registered_at)
+
+
+class BrokenConnection:
+    def open(self):
+        raise ConnectionRefusedError('smtp down')
+
+    def close(self):
+        pass
+
+
+class OutboxTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.attendee = User.objects.create_user('attendee', email='a@example.com', password='pass')
+        cls.event = make_event(cls.organizer, date(2025, 5, 1), title='Launch')
+
+    def test_registration_only_enqueues(self):
+        self.client.force_login(self.attendee)
+        self.client.get(reverse('register_for_event', args=[self.event.id]))
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboundEmail.objects.get()
+        self.assertEqual(queued.recipients, ['a@example.com'])
+        self.assertIn('Launch', queued.subject)
+
+    async def test_async_registration_queues_the_same_email(self):
+        await self.async_client.aforce_login(self.attendee)
+        await self.async_client.post(reverse('register_for_event', args=[self.event.id]))
+        queued = await OutboundEmail.objects.aget()
+        self.assertEqual(queued.recipients, ['a@example.com'])
+        self.assertIn('Launch', queued.subject)
+
+    def test_registration_and_email_commit_together(self):
+        with mock.patch('events.outbox.enqueue', side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            registrations.register_and_notify(self.event, self.attendee)
+        self.assertFalse(Registration.objects.filter(event=self.event, user=self.attendee).exists())
+
+    def test_worker_drains_in_batches(self):
+        for index in range(5):
+            outbox.enqueue(f'Subject {index}', 'Body', [f'user{index}@example.com'])
+        call_command('send_queued_mail', batch_size=2, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.SENT).count(), 5)
+
+    def test_overlapping_workers_send_each_message_once(self):
+        for index in range(3):
+            outbox.enqueue(f'Subject {index}', 'Body', [f'user{index}@example.com'])
+        claimed = outbox.claim_due(2)
+        # A second worker starting now only gets the unclaimed message
+        self.assertEqual(outbox.deliver_batch(), (1, 0))
+        self.assertEqual(outbox.deliver_batch(), (0, 0))
+        self.assertEqual([email.subject for email in mail.outbox], ['Subject 2'])
+        self.assertEqual([message.subject for message in claimed], ['Subject 0', 'Subject 1'])
+
+    @override_settings(EMAIL_OUTBOX_LEASE_SECONDS=0)
+    def test_expired_leases_are_retried(self):
+        outbox.enqueue('Subject', 'Body', ['a@example.com'])
+        outbox.claim_due(1)
+        self.assertEqual(outbox.deliver_batch(), (1, 0))
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_BACKOFF_SECONDS=30)
+    def test_failures_back_off_then_give_up(self):
+        message = outbox.enqueue('Subject', 'Body', ['a@example.com'])
+        self.assertEqual(outbox.deliver_batch(connection=BrokenConnection()), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboundEmail.PENDING)
+        self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=20))
+        self.assertIn('smtp down', message.last_error)
+        # Not due yet, so nothing is picked up.
+        self.assertEqual(outbox.deliver_batch(connection=BrokenConnection()), (0, 0))
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        outbox.deliver_batch(connection=BrokenConnection())
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboundEmail.FAILED)
+        self.assertEqual(message.attempts, 2)
+
+
+class TicketCacheTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.attendee = User.objects.create_user('attendee', password='pass')
+        cls.event = make_event(cls.organizer, date(2025, 5, 1))
+        cls.event.registered_users.add(cls.attendee)
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        override = override_settings(TICKET_CACHE_DIR=self.cache_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client.force_login(self.attendee)
+        self.url = reverse('download_ticket', args=[self.event.id])
+
+    def test_ticket_is_rendered_once_and_revalidated(self):
+        response = self.client.get(self.url)
+        body = b''.join(response.streaming_content)
+        self.assertTrue(body.startswith(b'%PDF'))
+        self.assertEqual(int(response['Content-Length']), len(body))
+        etag = response['ETag']
+
+        with mock.patch('events.tickets.render_ticket') as render:
+            response = self.client.get(self.url)
+            b''.join(response.streaming_content)
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        render.assert_not_called()
+        self.assertEqual(response.status_code, 304)
+
+    def test_editing_printed_fields_invalidates(self):
+        first = self.client.get(self.url)['ETag']
+        old_path = tickets.ticket_path(self.event, self.attendee, 'http://testserver')
+        self.assertTrue(old_path.exists())
+
+        self.event.address = 'New Venue'
+        self.event.save()
+        self.assertFalse(old_path.exists())
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first)
+
+    @override_settings(ALLOWED_HOSTS=['events.example.org'], SITE_URL='')
+    def test_qr_code_links_to_the_requested_site(self):
+        with mock.patch('events.tickets.qr.render_qr', wraps=qr.render_qr) as render:
+            b''.join(self.client.get(self.url, HTTP_HOST='events.example.org').streaming_content)
+        self.assertEqual(render.call_args.args[0], f'http://events.example.org/event/{self.event.id}/')
+
+
+class TicketExportTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.event = make_event(cls.organizer, date(2025, 5, 1))
+        for index in range(30):
+            cls.event.registered_users.add(User.objects.create_user(f'guest{index}'))
+
+    def test_organizer_downloads_zip(self):
+        self.client.force_login(self.organizer)
+        # The web path renders in-process unless TICKET_EXPORT_WEB_WORKERS says otherwise
+        with override_settings(TICKET_EXPORT_WORKERS=2), mock.patch('events.ticket_export.ProcessPoolExecutor') as pool:
+            response = self.client.get(reverse('export_tickets', args=[self.event.id]))
+            body = b''.join(response.streaming_content)
+        pool.assert_not_called()
+        with zipfile.ZipFile(BytesIO(body)) as archive:
+            names = archive.namelist()
+            self.assertEqual(len(names), 30)
+            self.assertIn('guest0_ticket.pdf', names)
+            self.assertTrue(archive.read('guest7_ticket.pdf').startswith(b'%PDF'))
+
+    def test_one_export_per_event_at_a_time(self):
+        self.client.force_login(self.organizer)
+        url = reverse('export_tickets', args=[self.event.id])
+        running = self.client.get(url)
+        self.assertRedirects(self.client.get(url), reverse('event_detail', args=[self.event.id]),
+                             fetch_redirect_response=False)
+        b''.join(running.streaming_content)
+        self.assertEqual(self.client.get(url)['Content-Type'], 'application/zip')
+
+    def test_attendees_cannot_export(self):
+        self.client.force_login(User.objects.get(username='guest0'))
+        response = self.client.get(reverse('export_tickets', args=[self.event.id]))
+        self.assertRedirects(response, reverse('home'))
+
+    def test_command_reports_throughput(self):
+        output = os.path.join(self.media_root, 'tickets.zip')
+        out = StringIO()
+        call_command(
+            'export_tickets', self.event.id, output=output, workers=1, base_url='https://events.example.com',
+            stdout=out,
+        )
+        self.assertIn('tickets/s', out.getvalue())
+        with zipfile.ZipFile(output) as archive:
+            self.assertEqual(len(archive.namelist()), 30)
+
+    def test_command_needs_a_site_url(self):
+        output = os.path.join(self.media_root, 'tickets.zip')
+        with override_settings(SITE_URL=''), self.assertRaisesMessage(CommandError, 'SITE_URL'):
+            call_command('export_tickets', self.event.id, output=output, workers=1)
+
+
+class QrCodeTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.event = make_event(cls.organizer, date(2025, 5, 1))
+
+    def test_save_is_a_single_write_without_encoding(self):
+        self.event.title = 'Renamed'
+        with mock.patch('events.qr.encode') as encode, CaptureQueriesContext(connection) as ctx:
+            self.event.save()
+        encode.assert_not_called()
+        writes = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "events_event"')]
+        self.assertEqual(len(writes), 1)
+
+    @override_settings(SITE_URL='https://events.example.com')
+    def test_qr_endpoint_formats_and_etag(self):
+        url = reverse('event_qr', args=[self.event.id, 'svg'])
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn(b'<svg', response.content)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        png = self.client.get(reverse('event_qr', args=[self.event.id, 'png']))
+        self.assertTrue(png.content.startswith(b'\x89PNG'))
+        self.assertEqual(self.client.get(reverse('event_qr', args=[self.event.id, 'gif'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('event_qr', args=[999, 'svg'])).status_code, 404)
+
+
+def png_upload(name='photo.png', size=(900, 600)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'teal').save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ImageDerivativeTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+
+    def test_upload_schedules_variants_after_commit(self):
+        with mock.patch('events.images.executor') as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                event = make_event(self.organizer, date(2025, 5, 1), image=png_upload())
+        executor.submit.assert_called_once_with(images.safe_build, event.image.name, mock.ANY)
+
+    def test_backfill_and_srcset(self):
+        with mock.patch('events.images.executor'):
+            event = make_event(self.organizer, date(2025, 5, 1), image=png_upload())
+        html = Template('{% load image_tags %}{% responsive_image event.image alt="x" %}')
+        self.assertNotIn('srcset', html.render(Context({'event': event})))
+
+        call_command('build_image_derivatives', stdout=StringIO())
+        # 900px original: 160/320/640 only, never upscaled to 1280
+        self.assertEqual(images.available_widths(event.image.name), [160, 320, 640])
+        with default_storage.open(images.variant_name(event.image.name, 320, 'webp')) as handle:
+            self.assertEqual(Image.open(handle).format, 'WEBP')
+
+        with mock.patch.object(event.image.storage, 'exists') as exists:
+            rendered = html.render(Context({'event': event}))
+        exists.assert_not_called()
+        self.assertIn('type="image/webp"', rendered)
+        self.assertIn('-640w.jpg 640w', rendered)
+        self.assertIn('alt="x"', rendered)
+
+
+class PageCacheTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.attendee = User.objects.create_user('attendee', password='pass')
+        cls.event = make_event(cls.organizer, date(2025, 5, 1), title='Original')
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        detail = reverse('event_detail', args=[self.event.id])
+        self.client.get(reverse('home'))
+        self.client.get(detail)
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(reverse('home')), 'Original')
+            self.assertContains(self.client.get(detail), 'Original')
+
+    def test_event_save_invalidates_feed_and_page(self):
+        detail = reverse('event_detail', args=[self.event.id])
+        self.client.get(reverse('home'))
+        self.client.get(detail)
+        self.event.title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.save()
+        self.assertContains(self.client.get(reverse('home')), 'Renamed')
+        self.assertContains(self.client.get(detail), 'Renamed')
+
+    def test_registration_bumps_event_version(self):
+        self.client.force_login(self.attendee)
+        detail = reverse('event_detail', args=[self.event.id])
+        self.assertNotContains(self.client.get(detail), 'already registered')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('register_for_event', args=[self.event.id]))
+        self.assertContains(self.client.get(detail), 'already registered')
+
+        version = page_cache.get_version(page_cache.event_scope(self.event.id))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.attendee.registered_events.clear()
+        self.assertNotEqual(page_cache.get_version(page_cache.event_scope(self.event.id)), version)
+
+    @override_settings(PAGE_CACHE_TIMEOUT=123)
+    def test_event_cards_use_the_page_cache_timeout(self):
+        self.client.force_login(self.attendee)
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.client.get(reverse('home'))
+        timeouts = {
+            call.args[2] for call in cache_set.call_args_list
+            if call.args[0].startswith('template.cache.event_card')
+        }
+        self.assertEqual(timeouts, {123})
+
+    def test_versions_are_bumped_after_commit(self):
+        scope = page_cache.event_scope(self.event.id)
+        version = page_cache.get_version(scope)
+        with self.captureOnCommitCallbacks() as callbacks:
+            registrations.register_and_notify(self.event, self.attendee)
+            # A miss now would still read the old rows, so it must use the old key
+            self.assertEqual(page_cache.get_version(scope), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(page_cache.get_version(scope), version)
+
+    def test_concurrent_misses_build_once(self):
+        calls = []
+        started = threading.Event()
+
+        def slow_builder():
+            calls.append(1)
+            started.set()
+            time_module.sleep(0.2)
+            return 'page'
+
+        results = []
+        worker = threading.Thread(target=lambda: results.append(page_cache.get_or_build('k', slow_builder)))
+        worker.start()
+        started.wait()
+        waiters = [
+            threading.Thread(target=lambda: results.append(page_cache.get_or_build('k', slow_builder)))
+            for _ in range(5)
+        ]
+        for thread in waiters:
+            thread.start()
+        for thread in [worker] + waiters:
+            thread.join()
+        self.assertEqual(results, ['page'] * 6)
+        self.assertEqual(len(calls), 1)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'SQLite pragmas')
+class ConnectionTuningTests(TestCase):
+    def test_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch('eventflow.db_router.replica_aliases', return_value=['replica1'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = db_router.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def run_view(self, view, cookies=None):
+        seen = {}
+
+        def wrapped(request):
+            seen['read'] = self.router.db_for_read(Event)
+            view()
+            seen['after'] = self.router.db_for_read(Event)
+            return HttpResponse()
+
+        request = self.factory.get('/')
+        request.COOKIES.update(cookies or {})
+        response = db_router.ReplicaPinningMiddleware(wrapped)(request)
+        return seen, response
+
+    def test_reads_use_replica_and_writes_pin_primary(self):
+        seen, response = self.run_view(lambda: None)
+        self.assertEqual(seen, {'read': 'replica1', 'after': 'replica1'})
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+
+        seen, response = self.run_view(lambda: self.router.db_for_write(Event))
+        self.assertEqual(seen, {'read': 'replica1', 'after': 'default'})
+        self.assertEqual(response.cookies[db_router.PIN_COOKIE]['max-age'], 10)
+
+        seen, _ = self.run_view(lambda: None, cookies={db_router.PIN_COOKIE: '1'})
+        self.assertEqual(seen['read'], 'default')
+        # Context is reset once the request is over.
+        self.assertEqual(self.router.db_for_read(Event), 'replica1')
+
+    def test_only_primary_is_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'events'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'events'))
+
+
+class ReplicaAliasTests(TransactionTestCase):
+    """Routing against two real SQLite replicas copied from the test database."""
+
+    def setUp(self):
+        self.event = make_event(User.objects.create_user('organizer'), date(2025, 5, 1))
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        # The aliases only exist while a test runs, so they cannot be
+        # declared in ``databases`` when the class is set up.
+        allowed = mock.patch.object(type(self), 'databases', {'default', 'replica1', 'replica2'})
+        allowed.start()
+        self.addCleanup(allowed.stop)
+        connection.ensure_connection()
+        for alias in ('replica1', 'replica2'):
+            path = os.path.join(directory, f'{alias}.sqlite3')
+            copy = sqlite3.connect(path)
+            connection.connection.backup(copy)
+            # Each copy says where a read was answered from
+            copy.execute('UPDATE events_event SET title = ?', [alias])
+            copy.commit()
+            copy.close()
+            connections.settings[alias] = dict(connections.settings['default'], NAME=path)
+            self.addCleanup(self.remove_alias, alias)
+
+    def remove_alias(self, alias):
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+    def read_titles(self):
+        titles = []
+
+        def view(request):
+            titles.extend(Event.objects.get(pk=self.event.pk).title for _ in range(5))
+            return HttpResponse()
+
+        db_router.ReplicaPinningMiddleware(view)(RequestFactory().get('/'))
+        return titles
+
+    def test_each_request_reads_from_one_replica(self):
+        for alias in ('replica1', 'replica2'):
+            with mock.patch('eventflow.db_router.random.choice', return_value=alias) as choice:
+                self.assertEqual(self.read_titles(), [alias] * 5)
+            choice.assert_called_once_with(['replica1', 'replica2'])
+
+
+class CapacityTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.event = make_event(cls.organizer, date(2025, 5, 1), capacity=2)
+        cls.users = [User.objects.create_user(f'user{index}') for index in range(4)]
+
+    def test_full_event_waitlists_and_promotes(self):
+        results = [registrations.register_user(self.event, user) for user in self.users]
+        self.assertEqual(results, [
+            registrations.REGISTERED, registrations.REGISTERED,
+            registrations.WAITLISTED, registrations.WAITLISTED,
+        ])
+        self.assertEqual(
+            registrations.register_user(self.event, self.users[0]), registrations.ALREADY_REGISTERED
+        )
+        self.assertEqual(
+            registrations.register_user(self.event, self.users[2]), registrations.ALREADY_WAITLISTED
+        )
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 2)
+
+        Registration.objects.get(event=self.event, user=self.users[0]).delete()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 2)
+        self.assertTrue(self.event.is_registered(self.users[2]))
+        self.assertFalse(self.event.is_waitlisted(self.users[2]))
+        self.assertTrue(self.event.is_waitlisted(self.users[3]))
+
+    def test_adding_past_capacity_is_rejected(self):
+        # add() runs without a savepoint, so each failure needs its own block
+        with self.assertRaises(registrations.EventFull), transaction.atomic():
+            self.event.registered_users.add(*self.users[:3])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 0)
+        self.assertFalse(Registration.objects.exists())
+
+        full = make_event(self.organizer, date(2025, 6, 1), capacity=0)
+        with self.assertRaises(registrations.EventFull), transaction.atomic():
+            self.users[0].registered_events.add(self.event, full)
+        self.event.registered_users.add(*self.users[:2])
+        with self.assertRaises(registrations.EventFull), transaction.atomic():
+            self.event.registered_users.add(self.users[2])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 2)
+        self.assertEqual(Registration.objects.count(), 2)
+
+    def test_release_skips_waitlisted_users_registered_elsewhere(self):
+        for user in self.users:
+            registrations.register_user(self.event, user)
+        # users[2] is first in line but got a registration row directly
+        Registration.objects.create(event=self.event, user=self.users[2])
+        Registration.objects.get(event=self.event, user=self.users[0]).delete()
+        self.assertTrue(self.event.is_registered(self.users[3]))
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_deleting_event_does_not_promote(self):
+        for user in self.users:
+            registrations.register_user(self.event, user)
+        self.event.delete()
+        self.assertFalse(Registration.objects.exists())
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_saving_a_stale_copy_keeps_the_seat_count(self):
+        stale = Event.objects.get(pk=self.event.pk)
+        registrations.register_user(self.event, self.users[0])
+        stale.title = 'Edited'
+        stale.save()
+        self.assertEqual(stale.seats_taken, 1)
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.title, self.event.seats_taken), ('Edited', 1))
+
+
+class LockRetryTests(TransactionTestCase):
+    def test_locked_database_is_retried_outside_transactions(self):
+        calls = []
+
+        @registrations.retry_when_locked
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'done'
+
+        with mock.patch('events.registrations.time.sleep') as sleep:
+            self.assertEqual(flaky(), 'done')
+            self.assertEqual(sleep.call_count, 2)
+            calls.clear()
+            with self.assertRaises(OperationalError), transaction.atomic():
+                flaky()
+        self.assertEqual(len(calls), 1)
+
+
+class CapacityStressTests(TransactionTestCase):
+    """Thousands of concurrent registrations never oversell a limited event."""
+
+    WRITERS = 16
+    ATTEMPTS = 2000
+    CAPACITY = 500
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('in-memory SQLite uses table locks; set DB_TEST_NAME to a file')
+
+    def test_concurrent_registrations_exact_counts(self):
+        organizer = User.objects.create_user('organizer')
+        event = make_event(organizer, date(2025, 5, 1), capacity=self.CAPACITY)
+        users = User.objects.bulk_create(
+            [User(username=f'stress{index}') for index in range(self.ATTEMPTS)]
+        )
+        results = []
+        errors = []
+        barrier = threading.Barrier(self.WRITERS)
+
+        def writer(chunk):
+            barrier.wait()
+            try:
+                for user in chunk:
+                    results.append(registrations.register_user(event, user))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=writer, args=(users[index::self.WRITERS],))
+            for index in range(self.WRITERS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(results.count(registrations.REGISTERED), self.CAPACITY)
+        self.assertEqual(results.count(registrations.WAITLISTED), self.ATTEMPTS - self.CAPACITY)
+        event.refresh_from_db()
+        self.assertEqual(event.seats_taken, self.CAPACITY)
+        self.assertEqual(Registration.objects.filter(event=event).count(), self.CAPACITY)
+        self.assertEqual(WaitlistEntry.objects.filter(event=event).count(), self.ATTEMPTS - self.CAPACITY)
+
+
+class ApiTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.attendee = User.objects.create_user('attendee', password='pass')
+        Event.objects.bulk_create([
+            Event(
+                title=f'Bulk {index}', description='', date=date(2025, 1, 1) + timedelta(days=index % 300),
+                time=time(9, 0), location='Pune', address='Hall', organizer=cls.organizer,
+            )
+            for index in range(1000)
+        ])
+        rebuild_index()  # bulk_create skips the post_save indexing signal
+        cls.event = Event.objects.order_by('id').first()
+        cls.event.registered_users.add(cls.attendee)
+
+    def test_thousand_events_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_event_list'), {'per_page': 1000})
+        payload = response.json()
+        self.assertEqual(len(payload['results']), 1000)
+        self.assertEqual(payload['results'][0]['organizer'], 'organizer')
+        self.assertIsNone(payload['next'])
+
+    def test_fields_projection_and_cursor(self):
+        first = self.client.get(reverse('api_event_list'), {'fields': 'title', 'per_page': 5}).json()
+        self.assertEqual(set(first['results'][0]), {'title'})
+        second = self.client.get(
+            reverse('api_event_list'), {'fields': 'id', 'per_page': 5, 'after': first['next']}
+        ).json()
+        expected = list(Event.objects.order_by('-date', '-id').values_list('id', flat=True)[5:10])
+        self.assertEqual([row['id'] for row in second['results']], expected)
+
+    def test_shares_home_filters(self):
+        payload = self.client.get(reverse('api_event_list'), {'q': 'Bulk 999', 'fields': 'title'}).json()
+        self.assertIn({'title': 'Bulk 999'}, payload['results'])
+
+    def test_etag_304_until_event_changes(self):
+        url = reverse('api_event_detail', args=[self.event.id])
+        response = self.client.get(url)
+        self.assertEqual(response.json()['seats_left'], None)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.event.title = 'Changed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_my_registrations(self):
+        self.assertEqual(self.client.get(reverse('api_my_registrations')).status_code, 401)
+        self.client.force_login(self.attendee)
+        response = self.client.get(reverse('api_my_registrations'), {'fields': 'id'})
+        self.assertEqual(response.json()['results'], [{'id': self.event.id}])
+        etag = response['ETag']
+        registrations.register_user(Event.objects.last(), self.attendee)
+        response = self.client.get(reverse('api_my_registrations'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+
+class AsyncViewTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.attendee = User.objects.create_user('attendee', password='pass')
+        cls.events = [make_event(cls.organizer, date(2025, 1, 1) + timedelta(days=offset)) for offset in range(3)]
+        cls.events[0].registered_users.add(cls.attendee)
+
+    async def test_asgi_requests_use_async_views(self):
+        from . import async_views
+
+        response = await self.async_client.get(reverse('home'))
+        self.assertIs(response.resolver_match.func, async_views.home)
+        self.assertEqual(list(response.context['events']), self.events[::-1])
+        # Plain WSGI requests keep the sync views.
+        self.assertIsNot(self.client.get(reverse('home')).resolver_match.func, async_views.home)
+
+    async def test_event_detail_and_registrations(self):
+        event = self.events[0]
+        response = await self.async_client.get(reverse('event_detail', args=[event.id]))
+        self.assertContains(response, event.title)
+        self.assertEqual((await self.async_client.get(reverse('event_detail', args=[999]))).status_code, 404)
+
+        await self.async_client.aforce_login(self.attendee)
+        response = await self.async_client.get(reverse('event_detail', args=[event.id]))
+        self.assertTrue(response.context['is_registered'])
+        response = await self.async_client.get(reverse('my_registrations'))
+        self.assertEqual(response.context['events'], [event])
+
+    async def test_register_and_ticket_off_the_loop(self):
+        event = self.events[1]
+        await self.async_client.aforce_login(self.attendee)
+        response = await self.async_client.post(reverse('register_for_event', args=[event.id]))
+        self.assertRedirects(response, reverse('event_detail', args=[event.id]), fetch_redirect_response=False)
+        self.assertTrue(await Registration.objects.filter(event=event, user=self.attendee).aexists())
+
+        threads = []
+        real_open_ticket = tickets.open_ticket
+
+        def open_ticket(*args):
+            threads.append(threading.get_ident())
+            return real_open_ticket(*args)
+
+        with override_settings(TICKET_CACHE_DIR=self.media_root), \
+                mock.patch('events.tickets.open_ticket', side_effect=open_ticket):
+            response = await self.async_client.get(reverse('download_ticket', args=[event.id]))
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            response.close()
+        # The file is opened in a worker thread, not on the event loop
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertEqual(len(threads), 1)
+
+
+class RegistrationExportTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.event = make_event(cls.organizer, date(2025, 3, 1))
+        users = User.objects.bulk_create([
+            User(username=f'attendee{index:02d}', email=f'a{index}@example.com') for index in range(25)
+        ])
+        moment = timezone.now()
+        Registration.objects.bulk_create([
+            # Pairs share a timestamp so ties are broken by id
+            Registration(event=cls.event, user=user, registered_at=moment + timedelta(seconds=index // 2))
+            for index, user in enumerate(users)
+        ])
+        # bulk_create skips the post_save receiver that creates profiles
+        UserProfile.objects.create(user=users[0], full_name='=HYPERLINK("x")')
+
+    def test_pages_walk_forward_and_back(self):
+        from .attendees import paginate_registrations
+
+        expected = list(self.event.registrations.order_by('registered_at', 'id'))
+        seen, after = [], None
+        while True:
+            page = paginate_registrations(self.event, after=after, page_size=10)
+            seen.extend(page)
+            if not page.has_next:
+                break
+            after = page.next_cursor
+        self.assertEqual(seen, expected)
+        previous = paginate_registrations(self.event, before=page.prev_cursor, page_size=10)
+        self.assertEqual(list(previous), expected[10:20])
+
+    def test_view_is_paginated_for_organizer_only(self):
+        self.client.force_login(self.organizer)
+        response = self.client.get(reverse('view_registrations', args=[self.event.id]), {'per_page': 10})
+        self.assertEqual(len(response.context['page']), 10)
+        self.assertEqual(response.context['total'], 25)
+        self.assertIsNotNone(response.context['next_url'])
+
+        self.client.force_login(User.objects.get(username='attendee01'))
+        response = self.client.get(reverse('export_registrations', args=[self.event.id]))
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+
+    def test_csv_streams_every_attendee_with_profile(self):
+        self.client.force_login(self.organizer)
+        # session, user, event, then every row from a single query
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('export_registrations', args=[self.event.id]))
+            self.assertTrue(response.streaming)
+            lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 26)
+        self.assertTrue(lines[0].startswith('Username,Email'))
+        # Profile values are joined in and formula-like cells are neutralised
+        self.assertIn('attendee00,a0@example.com,,,"\'=HYPERLINK(""x"")"', lines[1])
+
+
+class ImportTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.event = make_event(cls.organizer, date(2025, 4, 1), capacity=10)
+        cls.existing = User.objects.create_user('existing', password='keep')
+
+    def write(self, name, text):
+        path = os.path.join(self.media_root, name)
+        with open(path, 'w') as handle:
+            handle.write(text)
+        return path
+
+    def test_csv_import_is_idempotent(self):
+        path = self.write('people.csv', (
+            'username,email,password,full_name,event\n'
+            f'alice,alice@example.com,secret,Alice A,{self.event.id}\n'
+            f'bob,,,Bob B,{self.event.id}\n'
+            f'existing,,ignored,,{self.event.id}\n'
+            'carol,,,,999\n'
+            f'alice,,,,{self.event.id}\n'
+        ))
+        out = StringIO()
+        call_command('import_attendees', path, '--workers', '2', stdout=out)
+        self.assertIn('5 rows', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+
+        alice = User.objects.get(username='alice')
+        self.assertTrue(alice.check_password('secret'))
+        self.assertFalse(User.objects.get(username='bob').has_usable_password())
+        self.assertTrue(User.objects.get(username='existing').check_password('keep'))
+        self.assertEqual(alice.userprofile.full_name, 'Alice A')
+        self.assertEqual(UserProfile.objects.filter(user__username='carol').count(), 1)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 3)
+
+        call_command('import_attendees', path, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(UserProfile.objects.count(), 5)
+        self.assertEqual(Registration.objects.count(), 3)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 3)
+
+    def test_jsonl_with_default_event_and_prehashed_password(self):
+        from django.contrib.auth.hashers import make_password
+
+        hashed = make_password('already')
+        path = self.write('people.jsonl', '\n'.join([
+            '{"username": "dave", "password": "%s"}' % hashed,
+            '{"username": "erin", "phone": "+91 1"}',
+        ]))
+        call_command('import_attendees', path, '--event', str(self.event.id), stdout=StringIO())
+        self.assertTrue(User.objects.get(username='dave').check_password('already'))
+        self.assertEqual(UserProfile.objects.get(user__username='erin').phone, '+91 1')
+        self.assertEqual(set(self.event.registered_users.values_list('username', flat=True)), {'dave', 'erin'})
+
+    def test_rows_beyond_capacity_are_waitlisted(self):
+        event = make_event(self.organizer, date(2025, 4, 2), capacity=3)
+        registrations.register_user(event, self.existing)
+        path = self.write('full.csv', 'username\n' + ''.join(f'guest{index}\n' for index in range(5)))
+        out = StringIO()
+        call_command('import_attendees', path, '--event', str(event.id), '--chunk-size', '2', stdout=out)
+        self.assertIn('2 registrations, 3 waitlisted', out.getvalue())
+
+        event.refresh_from_db()
+        self.assertEqual((event.seats_taken, event.seats_left), (3, 0))
+        self.assertEqual(
+            set(event.registered_users.values_list('username', flat=True)), {'existing', 'guest0', 'guest1'},
+        )
+        waiting = WaitlistEntry.objects.filter(event=event).order_by('joined_at', 'id')
+        self.assertEqual([entry.user.username for entry in waiting], ['guest2', 'guest3', 'guest4'])
+
+        # Re-running neither registers nor queues anyone twice
+        call_command('import_attendees', path, '--event', str(event.id), stdout=StringIO())
+        self.assertEqual(WaitlistEntry.objects.filter(event=event).count(), 3)
+        self.assertEqual(Registration.objects.filter(event=event).count(), 3)
+
+
+class QueryBudgetMixin:
+    """assertQueryBudget(url, queries) for views, via the SQL instrumentation."""
+
+    def assertQueryBudget(self, url, queries, duplicates=0, **extra):
+        response = self.client.get(url, **extra)
+        stats = response.sql_stats
+        repeated = '\n'.join(f'  {count}x {sql}' for sql, count in stats.repeated(2).items())
+        self.assertLessEqual(
+            stats.queries, queries, f"{url} issued {stats.queries} queries, budget {queries}\n{repeated}"
+        )
+        self.assertLessEqual(
+            stats.duplicates, duplicates,
+            f"{url} repeated {stats.duplicates} queries, budget {duplicates}\n{repeated}",
+        )
+        return response
+
+
+@override_settings(SQL_INSTRUMENTATION=True)
+class QueryBudgetTests(QueryBudgetMixin, MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.attendee = User.objects.create_user('attendee', password='pass')
+        cls.events = [make_event(cls.organizer, date(2025, 5, 1) + timedelta(days=offset)) for offset in range(20)]
+        for event in cls.events[:10]:
+            event.registered_users.add(cls.attendee)
+
+    def test_page_budgets(self):
+        event = self.events[0]
+        self.client.force_login(self.attendee)
+        budgets = {
+            reverse('home'): 4,
+            reverse('event_detail', args=[event.id]): 5,
+            reverse('my_registrations'): 3,
+            reverse('user_dashboard'): 4,
+            reverse('api_event_list'): 3,
+        }
+        for url, queries in budgets.items():
+            with self.subTest(url=url):
+                self.assertQueryBudget(url, queries)
+
+        self.client.force_login(self.organizer)
+        self.assertQueryBudget(reverse('view_registrations', args=[event.id]), 5)
+        self.assertQueryBudget(reverse('my_events'), 4)
+
+    def test_server_timing_and_n_plus_one_warning(self):
+        def lazy_view(request):
+            for event in Event.objects.all():
+                event.organizer.username
+            return HttpResponse('ok')
+
+        request = RequestFactory().get('/lazy/')
+        with self.assertLogs('eventflow.sql', 'WARNING') as logs:
+            response = instrumentation.QueryInstrumentationMiddleware(lazy_view)(request)
+        self.assertEqual(response.sql_stats.queries, 21)
+        self.assertEqual(response.sql_stats.duplicates, 19)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="21 queries"', response['Server-Timing'])
+        self.assertIn('"count": 20', logs.output[0])
+
+
+class ProfilingTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='pass', is_staff=True)
+        cls.member = User.objects.create_user('member', password='pass')
+        make_event(cls.staff, date(2025, 6, 1))
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(PROFILE_DIR=tempfile.mkdtemp(dir=self.media_root), PROFILE_KEEP=3))
+
+    def test_staff_flag_and_signed_header_capture(self):
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('home'), {'profile': '1'}))
+        self.client.force_login(self.member)
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('home'), {'profile': '1'}))
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('home'), HTTP_X_PROFILE='forged:token'))
+
+        self.client.force_login(self.staff)
+        capture_id = self.client.get(reverse('home'), {'profile': '1'})['X-Profile-Id']
+        token = profiling.make_token()
+        self.client.logout()
+        self.assertIn('X-Profile-Id', self.client.get(reverse('home'), HTTP_X_PROFILE=token))
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('profile_list'))
+        self.assertEqual([entry['trigger'] for entry in response.context['captures']], ['token', 'staff'])
+        response = self.client.get(reverse('profile_detail', args=[capture_id]))
+        self.assertTrue(any('render' in row['function'] for row in response.context['functions']))
+
+    def test_sampling_keeps_a_bounded_ring_buffer(self):
+        with override_settings(PROFILE_SAMPLE_RATE=1):
+            ids = [self.client.get(reverse('home'))['X-Profile-Id'] for _ in range(5)]
+        self.assertEqual([entry['id'] for entry in profiling.captures()], ids[:-4:-1])
+
+    def test_pages_are_staff_only(self):
+        self.client.force_login(self.member)
+        self.assertEqual(self.client.get(reverse('profile_list')).status_code, 302)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(reverse('profile_detail', args=['..secret'])).status_code, 404)
+
+
+class ProtectedMediaTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.attendee = User.objects.create_user('attendee', password='pass')
+        cls.outsider = User.objects.create_user('outsider', password='pass')
+        cls.event = make_event(cls.organizer, date(2025, 6, 1), pdf='event_pdfs/guide.pdf')
+        Registration.objects.create(event=cls.event, user=cls.attendee)
+
+    def setUp(self):
+        super().setUp()
+        self.content = bytes(range(256)) * 40
+        for name in ('event_pdfs/guide.pdf', 'event_images/poster.jpg'):
+            os.makedirs(os.path.join(self.media_root, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(self.media_root, name), 'wb') as handle:
+                handle.write(self.content)
+        self.url = '/media/event_pdfs/guide.pdf'
+
+    def test_event_pdf_is_for_registrants_and_organizer(self):
+        self.assertEqual(self.client.get('/media/event_images/poster.jpg').status_code, 200)
+        self.assertFalse(media.is_public('qr_codes/event_1.png'))
+        self.assertRedirects(self.client.get(self.url), f'/login/?next={self.url}', fetch_redirect_response=False)
+        self.client.force_login(self.outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        for user in (self.attendee, self.organizer):
+            self.client.force_login(user)
+            response = self.client.get(self.url)
+            self.assertEqual(b''.join(response.streaming_content), self.content)
+            self.assertEqual(response['Cache-Control'], 'private, max-age=3600')
+        self.assertEqual(self.client.get('/media/event_pdfs/../event_pdfs/guide.pdf').status_code, 404)
+
+    def test_ranges_and_conditional_requests(self):
+        self.client.force_login(self.attendee)
+        full = self.client.get(self.url)
+        b''.join(full.streaming_content)
+        self.assertEqual(full['Accept-Ranges'], 'bytes')
+
+        partial = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(b''.join(partial.streaming_content), self.content[100:200])
+        self.assertEqual(partial['Content-Disposition'], full['Content-Disposition'])
+        tail = self.client.get(self.url, HTTP_RANGE='bytes=-10', HTTP_IF_RANGE=full['ETag'])
+        self.assertEqual(b''.join(tail.streaming_content), self.content[-10:])
+        stale = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"old"')
+        self.assertEqual(stale.status_code, 200)
+        b''.join(stale.streaming_content)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=99999-').status_code, 416)
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=full['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=full['Last-Modified']).status_code, 304)
+
+    def test_transfer_is_handed_to_the_front_end_server(self):
+        self.client.force_login(self.attendee)
+        with override_settings(MEDIA_ACCEL='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected-media/'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/event_pdfs/guide.pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response.content, b'')
+        with override_settings(MEDIA_ACCEL='x-sendfile'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root, 'event_pdfs', 'guide.pdf'))
+
+    def test_parse_range(self):
+        self.assertEqual(media.parse_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(media.parse_range('bytes=5-50', 10), (5, 9))
+        self.assertEqual(media.parse_range('bytes=-3', 10), (7, 9))
+        self.assertIsNone(media.parse_range('bytes=0-1,4-5', 10))
+        with self.assertRaises(media.UnsatisfiableRange):
+            media.parse_range('bytes=10-', 10)
+
+
+class StaticPipelineTests(MediaTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        source = os.path.join(cls.media_root, 'source')
+        os.makedirs(os.path.join(source, 'css'))
+        with open(os.path.join(source, 'css', 'app.css'), 'w') as handle:
+            handle.write('.card { margin: 0 auto; padding: 1rem; }\n' * 200)
+        with open(os.path.join(source, 'logo.png'), 'wb') as handle:
+            handle.write(os.urandom(1024))
+        cls.static_root = os.path.join(cls.media_root, 'static')
+        cls.enterClassContext(override_settings(STATICFILES_DIRS=[source], STATIC_ROOT=cls.static_root))
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def hashed(self, name):
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        return staticfiles_storage.stored_name(name)
+
+    def test_collectstatic_writes_hashed_names_and_variants(self):
+        css = self.hashed('css/app.css')
+        self.assertRegex(css, r'^css/app\.[0-9a-f]{12}\.css$')
+        self.assertTrue(os.path.exists(os.path.join(self.static_root, css + '.gz')))
+        self.assertEqual(os.path.exists(os.path.join(self.static_root, css + '.br')), staticfiles.brotli is not None)
+        # Not compressible
+        self.assertFalse(os.path.exists(os.path.join(self.static_root, self.hashed('logo.png') + '.gz')))
+
+    def test_names_missing_from_the_manifest(self):
+        # Collected after the manifest was written: hashed on the fly
+        with open(os.path.join(self.static_root, 'late.txt'), 'w') as handle:
+            handle.write('late')
+        self.assertRegex(self.hashed('late.txt'), r'^late\.[0-9a-f]{12}\.txt$')
+        with self.assertRaises(ValueError):
+            self.hashed('missing.png')
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.hashed('missing.png'), 'missing.png')
+        # Before collectstatic has run there is no manifest to check against
+        with override_settings(STATIC_ROOT=os.path.join(self.media_root, 'empty')):
+            self.assertEqual(self.hashed('css/app.css'), 'css/app.css')
+
+    def test_negotiates_encoding_and_caches_hashed_names(self):
+        url = '/static/' + self.hashed('css/app.css')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        body = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertIn(b'.card', gzip.decompress(body))
+
+        identity = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', identity)
+        self.assertNotEqual(identity['ETag'], response['ETag'])
+        b''.join(identity.streaming_content)
+
+        not_modified = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_unhashed_names_get_a_short_lifetime(self):
+        with override_settings(STATIC_MAX_AGE=30):
+            response = self.client.get('/static/logo.png')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=30')
+        self.assertNotIn('Vary', response)
+        b''.join(response.streaming_content)
+        self.assertEqual(self.client.get('/static/missing.css').status_code, 404)
+
+
+class ConditionalGetTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.attendee = User.objects.create_user('attendee', password='pass')
+        cls.event = make_event(cls.organizer, date(2025, 6, 1), capacity=10)
+
+    def test_edits_and_registrations_bump_the_version(self):
+        version, updated_at = self.event.version, self.event.updated_at
+        self.event.title = 'Renamed'
+        self.event.save(update_fields=['title'])
+        self.assertEqual(self.event.version, version + 1)
+        registrations.register_user(self.event, self.attendee)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.version, version + 2)
+        self.assertGreater(self.event.updated_at, updated_at)
+
+    def test_event_detail_revalidates_with_one_lookup(self):
+        url = reverse('event_detail', args=[self.event.id])
+        self.client.force_login(self.attendee)
+        response = self.client.get(url)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+        # Session, user and the event's version
+        with self.assertNumQueries(3):
+            revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        registrations.register_user(self.event, self.organizer)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+        # Anonymous pages are validated against the page cache alone
+        self.client.logout()
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_home_changes_etag_when_an_event_changes(self):
+        etag = self.client.get(reverse('home'))['ETag']
+        self.assertEqual(self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertNotEqual(self.client.get(reverse('home'), {'q': 'x'})['ETag'], etag)
+        self.event.description = 'Updated'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.save()
+        self.assertEqual(self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_joining_the_waitlist_changes_the_etag(self):
+        event = make_event(self.organizer, date(2025, 7, 1), capacity=1)
+        registrations.register_user(event, self.organizer)
+        self.client.force_login(self.attendee)
+        url = reverse('event_detail', args=[event.id])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(registrations.register_user(event, self.attendee), registrations.WAITLISTED)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['is_waitlisted'])
+
+    def test_missing_events_never_match_a_wildcard(self):
+        url = reverse('event_detail', args=[999999])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 404)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 404)
+        detail = reverse('event_detail', args=[self.event.id])
+        self.client.get(detail)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH='*').status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Event.objects.get(pk=self.event.id).delete()
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH='*').status_code, 404)
+
+    def test_flash_messages_are_never_answered_with_304(self):
+        self.client.force_login(self.attendee)
+        url = reverse('event_detail', args=[self.event.id])
+        etag = self.client.get(url)['ETag']
+        self.client.cookies['messages'] = 'pending'
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    async def test_async_views_revalidate(self):
+        url = reverse('event_detail', args=[self.event.id])
+        await self.async_client.aforce_login(self.attendee)
+        etag = (await self.async_client.get(url))['ETag']
+        self.assertEqual((await self.async_client.get(url, headers={'If-None-Match': etag})).status_code, 304)
+
+
+class CalendarFeedTests(MediaTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', password='pass')
+        cls.attendee = User.objects.create_user('attendee', password='pass')
+        cls.events = [
+            make_event(cls.organizer, date(2025, 6, 1) + timedelta(days=offset), title=f'Meetup {offset}')
+            for offset in range(3)
+        ]
+        registrations.register_user(cls.events[0], cls.attendee)
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('ical_feed', args=[ical.feed_token(self.attendee.pk)])
+
+    def test_feed_lists_registered_events_and_revalidates_from_cache(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('SUMMARY:Meetup 0\r\n', body)
+        self.assertNotIn('Meetup 1', body)
+        # 2025-06-01 18:00 in Asia/Kolkata
+        self.assertIn('DTSTART:20250601T123000Z', body)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            registrations.register_user(self.events[1], self.attendee)
+            self.events[0].title = 'Renamed'
+            self.events[0].save()
+        # The ids and both changed blocks are rebuilt; nothing else
+        with self.assertNumQueries(2):
+            updated = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(updated.status_code, 200)
+        self.assertIn('SUMMARY:Renamed', updated.content.decode())
+        self.assertIn('SUMMARY:Meetup 1', updated.content.decode())
+
+    def test_bad_tokens_and_event_download(self):
+        self.assertEqual(self.client.get(reverse('ical_feed', args=['1:forged'])).status_code, 404)
+        response = self.client.get(reverse('event_ical', args=[self.events[2].pk]))
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="event-{self.events[2].pk}.ics"')
+        self.assertIn('BEGIN:VEVENT', response.content.decode())
+        self.assertEqual(self.client.get(reverse('event_ical', args=[999])).status_code, 404)
+
+    def test_text_is_escaped_and_folded(self):
+        self.assertEqual(ical.escape('a,b;c\nd'), 'a\\,b\\;c\\nd')
+        line = 'DESCRIPTION:' + 'é' * 60
+        folded = ical.fold(line)
+        self.assertTrue(all(len(part.encode()) <= 75 for part in folded.split('\r\n')))
+        self.assertEqual(folded.replace('\r\n ', '').rstrip('\r\n'), line)
+
+    def test_my_registrations_links_the_feed(self):
+        self.client.force_login(self.attendee)
+        self.assertContains(self.client.get(reverse('my_registrations')), self.url)
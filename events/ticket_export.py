@@ -0,0 +1,158 @@
+import logging
+import multiprocessing
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from .tickets import render_ticket
+
+logger = logging.getLogger(__name__)
+
+
+# Bulk ticket export: ReportLab rendering is CPU bound, so attendees are
+# rendered in chunks across a process pool and streamed out as a ZIP.
+# Workers only get plain data and never touch the database.
+#
+# The export_tickets command may use every CPU. The web view renders with
+# TICKET_EXPORT_WEB_WORKERS (default 1: in the request thread, no fork)
+# and allows one export per event at a time, so organizers cannot pile up
+# process pools inside the web workers.
+
+CHUNK_SIZE = 25
+EXPORT_LOCK_TIMEOUT = 60 * 10
+
+
+def default_workers():
+    return getattr(settings, 'TICKET_EXPORT_WORKERS', None) or os.cpu_count() or 1
+
+
+def web_workers():
+    return getattr(settings, 'TICKET_EXPORT_WEB_WORKERS', None) or 1
+
+
+def render_chunk(event, attendees, base_url):
+    rendered = []
+    for pk, username in attendees:
+        user = User(pk=pk, username=username)
+        rendered.append((f'{username}_ticket.pdf', render_ticket(event, user, base_url)))
+    return rendered
+
+
+def attendee_chunks(event, chunk_size=CHUNK_SIZE):
+    chunk = []
+    rows = (
+        event.registrations.order_by('registered_at', 'id')
+        .values_list('user_id', 'user__username')
+        .iterator(chunk_size=2000)
+    )
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def pool_context():
+    # Forked workers inherit the configured Django app registry.
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def iter_tickets(event, base_url, workers=None):
+    """Yield (filename, pdf bytes) for every registrant of ``event``, in order.
+
+    At most two chunks per worker are in flight, so memory stays bounded no
+    matter how many attendees the event has.
+    """
+    workers = workers or default_workers()
+    chunks = attendee_chunks(event)
+    if workers == 1:
+        for chunk in chunks:
+            yield from render_chunk(event, chunk, base_url)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context()) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(render_chunk, event, chunk, base_url))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+class StreamBuffer:
+    """Write-only file object that hands its contents back between writes."""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_ticket_zip(event, base_url, workers=None, stats=None):
+    """Yield a ZIP archive of all tickets for ``event`` piece by piece.
+
+    ``base_url`` is the site root the tickets' QR codes link to.
+    """
+    stats = stats if stats is not None else {}
+    started = time.monotonic()
+    count = 0
+    buffer = StreamBuffer()
+    # PDFs are already compressed; storing them keeps the CPU for rendering.
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for filename, data in iter_tickets(event, base_url, workers):
+            archive.writestr(filename, data)
+            count += 1
+            yield buffer.drain()
+    yield buffer.drain()
+
+    elapsed = time.monotonic() - started
+    stats.update(
+        tickets=count,
+        seconds=elapsed,
+        tickets_per_second=count / elapsed if elapsed else 0.0,
+    )
+    logger.info(
+        "Exported %d tickets for event %s in %.2fs (%.1f tickets/s)",
+        count, event.pk, elapsed, stats['tickets_per_second'],
+    )
+
+
+def web_export(event, base_url):
+    """ZIP stream for the export view, or None while one for ``event`` runs."""
+    lock = f'ticket-export:{event.pk}'
+    if not cache.add(lock, 1, EXPORT_LOCK_TIMEOUT):
+        return None
+
+    def stream():
+        try:
+            yield from stream_ticket_zip(event, base_url, workers=web_workers())
+        finally:
+            cache.delete(lock)
+
+    return stream()
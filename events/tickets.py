@@ -0,0 +1,98 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from . import qr
+
+
+# Rendered tickets are cached on disk, content-addressed by the event fields
+# printed on the ticket plus the attendee and the site URL in the QR code.
+# Editing any of those fields changes the key, so stale tickets are never
+# served.
+
+def cache_dir():
+    return Path(getattr(settings, 'TICKET_CACHE_DIR', Path(settings.BASE_DIR) / 'ticket_cache'))
+
+
+def event_fingerprint(event):
+    parts = [event.pk, event.title, event.date, event.time, event.address]
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()[:16]
+
+
+def ticket_key(event, user, base_url):
+    user_part = hashlib.sha1(f'{user.pk}|{user.username}|{base_url}'.encode()).hexdigest()[:8]
+    return f'{event_fingerprint(event)}-{user_part}'
+
+
+def ticket_path(event, user, base_url):
+    return cache_dir() / str(event.pk) / f'{user.pk}-{ticket_key(event, user, base_url)}.pdf'
+
+
+def draw_ticket(p, event, user, base_url):
+    width, height = A4
+
+    p.setFont("Helvetica-Bold", 20)
+    p.drawCentredString(width / 2, height - 100, "🎟 Event Ticket")
+
+    p.setFont("Helvetica", 14)
+    p.drawString(100, height - 150, f"Event: {event.title}")
+    p.drawString(100, height - 170, f"Date: {event.date}")
+    p.drawString(100, height - 190, f"Time: {event.time}")
+    p.drawString(100, height - 210, f"Address: {event.address}")
+    p.drawString(100, height - 230, f"Registered to: {user.username}")
+
+    qr_image = ImageReader(BytesIO(qr.render_qr(qr.event_url(event.pk, base_url), 'png')))
+    p.drawImage(qr_image, width - 250, height - 320, width=100, height=100)
+
+    p.showPage()
+
+
+def render_ticket(event, user, base_url):
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+    draw_ticket(p, event, user, base_url)
+    p.save()
+    return buffer.getvalue()
+
+
+def get_ticket(event, user, base_url):
+    """Return the path of the cached ticket, rendering it on a miss."""
+    path = ticket_path(event, user, base_url)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = render_ticket(event, user, base_url)
+    # Write then rename so concurrent downloads never see a partial file
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as handle:
+        handle.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+def open_ticket(event, user, base_url):
+    """get_ticket(), opened for reading."""
+    return open(get_ticket(event, user, base_url), 'rb')
+
+
+def purge_stale(event):
+    """Drop cached tickets rendered from an older version of ``event``."""
+    directory = cache_dir() / str(event.pk)
+    if not directory.is_dir():
+        return
+    current = event_fingerprint(event)
+    for path in directory.glob('*.pdf'):
+        if f'-{current}-' not in path.name:
+            path.unlink(missing_ok=True)
+
+
+def purge_event(event_id):
+    shutil.rmtree(cache_dir() / str(event_id), ignore_errors=True)
@@ -4,41 +4,56 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
-from django.core.mail import send_mail
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q
+from django.utils.http import parse_etags
+from django.db.models import Prefetch, Q
 from django.contrib.auth.models import User
 from .models import Event
 from .forms import EventForm
 from .forms import UserProfileForm
 from .models import UserProfile
-# For PDF generation
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.utils import ImageReader
 from .models import Event
+from .pagination import get_page_size, page_url, paginate_events
+from .filters import filter_events
+from . import attendees, ical, page_cache, qr, registrations, tickets
+from .conditional import conditional_page, event_validators, home_validators, ticket_validators
+from .ticket_export import web_export
 #  Home view with search & filter
+@conditional_page(home_validators)
 def home(request):
-    query = request.GET.get('q', '')
-    date_filter = request.GET.get('date', '')
-
-    events = Event.objects.all()
-
-    if query:
-        events = events.filter(
-            Q(title__icontains=query) |
-            Q(location__icontains=query)
-        )
+    if page_cache.is_cacheable(request):
+        return page_cache.cached_response(page_cache.feed_key(request), lambda: render_home(request))
+    return render_home(request)
 
-    if date_filter == 'upcoming':
-        events = events.filter(date__gte=timezone.now().date())
-    elif date_filter == 'past':
-        events = events.filter(date__lt=timezone.now().date())
 
-    events = events.order_by('-date')
-    return render(request, 'home.html', {'events': events})
+def render_home(request):
+    query = request.GET.get('q', '')
+    sort = request.GET.get('sort', '')
+
+    # Best-match ordering has no stable keyset, so it shows a single ranked page
+    if query and sort == 'relevance':
+        events = filter_events(Event.objects.all(), request.GET, ranked=True)
+        events = list(events[:get_page_size(request)])
+        page_cache.attach_versions(events)
+        return render(request, 'home.html', {'events': events, 'cache_timeout': page_cache.timeout()})
+
+    events = filter_events(Event.objects.all(), request.GET)
+    page = paginate_events(
+        events,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=get_page_size(request),
+    )
+    page_cache.attach_versions(page.items)
+    return render(request, 'home.html', {
+        'events': page,
+        'page': page,
+        'cache_timeout': page_cache.timeout(),
+        'next_url': page_url(request, after=page.next_cursor) if page.has_next else None,
+        'prev_url': page_url(request, before=page.prev_cursor) if page.has_previous else None,
+    })
 
 
 @login_required
@@ -56,19 +71,48 @@ def create_event(request):
     return render(request, 'create_event.html', {'form': form})
 
 
+@conditional_page(event_validators)
 def event_detail(request, event_id):
-    event = get_object_or_404(Event, id=event_id)
-    is_registered = request.user in event.registered_users.all() if request.user.is_authenticated else False
+    if page_cache.is_cacheable(request):
+        return page_cache.cached_response(
+            page_cache.event_page_key(event_id), lambda: render_event_detail(request, event_id)
+        )
+    return render_event_detail(request, event_id)
+
+
+def render_event_detail(request, event_id):
+    event = page_cache.get_or_build(
+        page_cache.event_object_key(event_id),
+        lambda: get_object_or_404(Event.objects.select_related('organizer'), id=event_id),
+    )
+    is_registered = event.is_registered(request.user)
+    is_waitlisted = not is_registered and event.capacity is not None and event.is_waitlisted(request.user)
     return render(request, 'event_detail.html', {
         'event': event,
-        'is_registered': is_registered
+        'is_registered': is_registered,
+        'is_waitlisted': is_waitlisted,
     })
 
 
+#  QR code for an event, generated on demand and cached
+def event_qr(request, event_id, fmt):
+    if fmt not in qr.FORMATS or not Event.objects.filter(id=event_id).exists():
+        raise Http404
+    url = qr.event_url(event_id, qr.base_url(request))
+    etag = qr.qr_etag(url, fmt)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(qr.render_qr(url, fmt), content_type=qr.FORMATS[fmt])
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=86400'
+    return response
+
+
 @login_required
 def update_event(request, event_id):
     event = get_object_or_404(Event, id=event_id)
-    if request.user != event.organizer:
+    if event.organizer_id != request.user.id:
         messages.error(request, "You are not authorized to edit this event.")
         return redirect('home')
 
@@ -86,7 +130,7 @@ def update_event(request, event_id):
 @login_required
 def delete_event(request, event_id):
     event = get_object_or_404(Event, id=event_id)
-    if request.user != event.organizer:
+    if event.organizer_id != request.user.id:
         messages.error(request, "You are not authorized to delete this event.")
         return redirect('home')
 
@@ -125,26 +169,17 @@ class CustomLoginView(LoginView):
 def register_for_event(request, event_id):
     event = get_object_or_404(Event, id=event_id)
 
-    if request.user in event.registered_users.all():
+    result = registrations.register_and_notify(event, request.user)
+    if result == registrations.ALREADY_REGISTERED:
         messages.info(request, "You are already registered for this event.")
+    elif result == registrations.ALREADY_WAITLISTED:
+        messages.info(request, "You are already on the waitlist for this event.")
+    elif result == registrations.WAITLISTED:
+        messages.warning(request, "This event is full. You have been added to the waitlist.")
     else:
-        event.registered_users.add(request.user)
         messages.success(request, "You have successfully registered for the event.")
-
-        #  Send confirmation email
-        if request.user.email:
-            subject = f"Registration Confirmation: {event.title}"
-            message = (
-                f"Hi {request.user.username},\n\n"
-                f"You have successfully registered for the event: {event.title}.\n\n"
-                f"📅 Date: {event.date}\n"
-                f"⏰ Time: {event.time}\n"
-                f"📍 Address: {event.address}\n\n"
-                f"Thank you for registering!\n"
-                f"- EventFlow Team"
-            )
-            recipient_list = [request.user.email]
-            send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, recipient_list)
+        if getattr(settings, 'TICKET_PRERENDER', False):
+            tickets.get_ticket(event, request.user, qr.base_url(request))
 
     return redirect('event_detail', event_id=event.id)
 
@@ -152,59 +187,82 @@ def register_for_event(request, event_id):
 @login_required
 def my_registrations(request):
     registered_events = request.user.registered_events.all().order_by('-date')
-    return render(request, 'my_registrations.html', {'events': registered_events})
+    return render(request, 'my_registrations.html', {
+        'events': registered_events,
+        'feed_url': ical.feed_url(request, request.user),
+    })
 
 
 @login_required
+@conditional_page(ticket_validators)
 def download_ticket(request, event_id):
     event = get_object_or_404(Event, id=event_id)
 
-    if request.user not in event.registered_users.all():
+    if not event.is_registered(request.user):
         messages.error(request, "You are not registered for this event.")
         return redirect('event_detail', event_id=event.id)
 
-    response = HttpResponse(content_type='application/pdf')
+    response = FileResponse(
+        tickets.open_ticket(event, request.user, qr.base_url(request)), content_type='application/pdf'
+    )
     response['Content-Disposition'] = f'attachment; filename="{event.title}_ticket.pdf"'
+    return response
 
-    p = canvas.Canvas(response, pagesize=A4)
-    width, height = A4
-
-    p.setFont("Helvetica-Bold", 20)
-    p.drawCentredString(width / 2, height - 100, "🎟 Event Ticket")
-
-    p.setFont("Helvetica", 14)
-    p.drawString(100, height - 150, f"Event: {event.title}")
-    p.drawString(100, height - 170, f"Date: {event.date}")
-    p.drawString(100, height - 190, f"Time: {event.time}")
-    p.drawString(100, height - 210, f"Address: {event.address}")
-    p.drawString(100, height - 230, f"Registered to: {request.user.username}")
-
-    if event.qr_code:
-        qr_path = event.qr_code.path
-        qr_image = ImageReader(qr_path)
-        p.drawImage(qr_image, width - 250, height - 320, width=100, height=100)
 
-    p.showPage()
-    p.save()
+#  Organizer-only ZIP of every attendee's ticket
+@login_required
+def export_tickets(request, event_id):
+    event = get_object_or_404(Event, id=event_id)
+    if event.organizer_id != request.user.id:
+        messages.error(request, "Only the organizer can export tickets.")
+        return redirect('home')
 
+    stream = web_export(event, qr.base_url(request))
+    if stream is None:
+        messages.warning(request, "A ticket export for this event is already running. Try again shortly.")
+        return redirect('event_detail', event_id=event.id)
+    response = StreamingHttpResponse(stream, content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{event.title}_tickets.zip"'
     return response
 
 
 @login_required
 def view_registrations(request, event_id):
     event = get_object_or_404(Event, id=event_id)
-    if request.user != event.organizer:
+    if event.organizer_id != request.user.id:
         messages.error(request, "Only the organizer can view registrations.")
         return redirect('home')
 
-    registered_users = event.registered_users.all()
+    page = attendees.paginate_registrations(
+        event,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=get_page_size(request),
+    )
     return render(request, 'view_registrations.html', {
         'event': event,
-        'registered_users': registered_users
+        'page': page,
+        'total': event.registrations.count(),
+        'next_url': page_url(request, after=page.next_cursor) if page.has_next else None,
+        'prev_url': page_url(request, before=page.prev_cursor) if page.has_previous else None,
     })
 
 
+#  Organizer-only CSV of every registrant, streamed row by row
+@login_required
+def export_registrations(request, event_id):
+    event = get_object_or_404(Event, id=event_id)
+    if event.organizer_id != request.user.id:
+        messages.error(request, "Only the organizer can export registrations.")
+        return redirect('home')
+
+    response = StreamingHttpResponse(attendees.stream_csv(event), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{event.title}_registrations.csv"'
+    return response
+
+
 #  User Dashboard View (UPDATED TEMPLATE PATH)
+@login_required
 def user_dashboard(request):
     user = request.user
     events = user.registered_events.all()
@@ -268,5 +326,8 @@ def my_events(request):
 
 @login_required
 def my_events(request):
-    my_created_events = Event.objects.filter(organizer=request.user)
+    my_created_events = (
+        Event.objects.filter(organizer=request.user).order_by('-date')
+        .prefetch_related(Prefetch('registered_users', queryset=User.objects.only('username', 'email')))
+    )
     return render(request, 'events/my_events.html', {'my_created_events': my_created_events})